@@ -0,0 +1,200 @@
+import time #medir la descarga de cada rango
+from collections import deque #rangos pendientes
+from datetime import datetime, timedelta
+from SRC.Extract.extractor import (create_bulk_read_job, get_job_status, initialize_zoho_sdk, select_fields, _download_page,
+                                   IncompleteExtractionError, ZOHO_MAX_CONCURRENT_JOBS, ZOHO_TIMEZONE)
+from SRC.Extract.poller import JobPoller #consulta adaptativa del estado de los trabajos
+from SRC.Extract.checkpoint import ExtractionCheckpoint #reanudar el backfill a partir de los rangos ya descargados
+from SRC.helper.metrics import PipelineMetrics #tiempos de cola y bytes por rango
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("backfill")
+
+# Rangos iniciales en que se divide el módulo
+DEFAULT_INITIAL_SLICES = 8
+# Duración mínima de un rango; un rango más corto con más de 200.000 registros se pagina en lugar de dividirse
+DEFAULT_MIN_SLICE_MINUTES = 60
+
+
+def default_backfill_end() -> str:
+    """Medianoche del día siguiente en la zona horaria de Zoho: cubre todo lo creado hasta ahora y es estable durante el día."""
+    tomorrow = datetime.now(ZOHO_TIMEZONE) + timedelta(days=1)
+    return tomorrow.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+
+def _parse_date(value: str) -> datetime:
+    # fromisoformat no acepta el sufijo Z antes de Python 3.11; una fecha sin zona se toma en la zona horaria de Zoho.
+    # Todo se lleva a la zona de Zoho para que las claves de los rangos compartan el mismo desfase y se ordenen como texto
+    parsed = datetime.fromisoformat(value[:-1] + '+00:00' if value.upper().endswith('Z') else value)
+    return parsed.replace(tzinfo=ZOHO_TIMEZONE) if parsed.tzinfo is None else parsed.astimezone(ZOHO_TIMEZONE)
+
+
+def split_range(start: str, end: str, parts: int) -> list:
+    """
+    Divide el rango [start, end) en `parts` rangos consecutivos de igual duración (fechas ISO 8601, precisión de segundos).
+    Las fechas sin zona horaria (por ejemplo "2015-01-01") se interpretan en la zona horaria de Zoho, y todos
+    los límites se expresan en esa zona.
+    """
+    start_dt, end_dt = _parse_date(start), _parse_date(end)
+    step = (end_dt - start_dt) / parts
+    bounds = [start_dt + step * i for i in range(parts)] + [end_dt]
+    bounds = [bound.replace(microsecond=0).isoformat() for bound in bounds]
+    return [(bounds[i], bounds[i + 1]) for i in range(parts) if bounds[i] < bounds[i + 1]]
+
+
+def _slice_key(start: str, end: str, page: int) -> str:
+    # Clave del rango y página: ordena cronológicamente (página con ceros a la izquierda) y sirve de clave en el manifiesto
+    return f"{start}/{end}#{page:05d}"
+
+
+def _iter_slices(module_api_name: str, start: str, end: str, initial_slices: int, min_slice_minutes: float, created_column_date: str, updated_column_date: str, max_concurrent_jobs: int, job_slots=None, checkpoint: ExtractionCheckpoint = None, metrics: PipelineMetrics = None, fields: list = None):
+    """
+    Extrae el módulo por rangos de created_column_date, cada uno como un trabajo independiente,
+    manteniendo hasta max_concurrent_jobs trabajos en vuelo. Un rango cuyo trabajo responde
+    more_records=True se divide en dos (su resultado se descarta); si ya tiene la duración mínima,
+    se pagina dentro del rango. Genera (clave, BytesIO) en orden de finalización. Los rangos que
+    fallan no detienen a los demás; al final se lanza IncompleteExtractionError si alguno falló.
+    """
+    pending = deque((range_start, range_end, 1) for range_start, range_end in split_range(start, end, initial_slices))
+    in_flight = {} # (inicio, fin, pagina) -> job_id
+    failed = []
+    min_slice = timedelta(minutes=min_slice_minutes)
+    poller = JobPoller(module_api_name, True, get_job_status, max_interval=60)
+
+    def release_slot():
+        if job_slots is not None:
+            job_slots.release()
+
+    def can_split(item) -> bool:
+        range_start, range_end, page = item
+        return page == 1 and _parse_date(range_end) - _parse_date(range_start) >= 2 * min_slice
+
+    def split(item) -> list:
+        range_start, range_end, _ = item
+        return [(half_start, half_end, 1) for half_start, half_end in split_range(range_start, range_end, 2)]
+
+    try:
+        while pending or in_flight:
+            # 1. Llenar los cupos libres con los rangos pendientes
+            while pending and len(in_flight) < max_concurrent_jobs:
+                item = pending[0]
+                key = _slice_key(*item)
+                if checkpoint is not None:
+                    # Rangos ya cargados, ya descargados o ya divididos en una ejecución anterior
+                    spooled_content = checkpoint.load_page(key)
+                    entry = checkpoint.get_page(key) or {}
+                    if entry.get('state') == 'LOADED':
+                        pending.popleft()
+                        if entry.get('more_records'):
+                            pending.append((item[0], item[1], item[2] + 1))
+                        logger.info(f"BACKFILL: Rango {key} ya cargado en una ejecución anterior. Se omite.")
+                        continue
+                    if spooled_content is not None:
+                        pending.popleft()
+                        if entry.get('more_records'):
+                            pending.append((item[0], item[1], item[2] + 1))
+                        logger.info(f"BACKFILL: Rango {key} recuperado del disco.")
+                        yield key, spooled_content
+                        continue
+                    if entry.get('state') == 'COMPLETED' and entry.get('more_records') and can_split(item):
+                        pending.popleft()
+                        pending.extend(split(item))
+                        continue
+                # Sin cupo global: si no hay nada en vuelo se espera un cupo, si no se sigue consultando
+                if job_slots is not None and not job_slots.acquire(blocking=not in_flight):
+                    break
+                pending.popleft()
+                if checkpoint is not None and checkpoint.job_is_reusable(key):
+                    job_id = checkpoint.get_page(key)['job_id']
+                    logger.info(f"BACKFILL: Retomando el Job ID {job_id} del rango {key}.")
+                    in_flight[item] = job_id
+                    poller.add(item, job_id, first_wait=0)
+                    continue
+                job_id = create_bulk_read_job(module_api_name, item[2], True, created_column_date, updated_column_date, 0, created_range=(item[0], item[1]), fields=fields)
+                if not job_id:
+                    logger.error(f"BACKFILL: No se pudo crear el trabajo del rango {key}.")
+                    failed.append(key)
+                    release_slot()
+                    continue
+                in_flight[item] = job_id
+                poller.add(item, job_id)
+                if checkpoint is not None:
+                    checkpoint.update_page(key, job_id=job_id, state='CREATED', created_at=time.time(), more_records=None, count=None, spool_path=None, checksum=None)
+
+            if not in_flight:
+                continue
+
+            # 2. Consultar los trabajos en vuelo a los que les toca revisión
+            for item, job_id, status_info in poller.poll():
+                del in_flight[item]
+                release_slot()
+                key = _slice_key(*item)
+                current_state = status_info.get('state') if status_info else 'FAILED'
+                more_records = status_info.get('more_records') if status_info else None
+                job_stats = poller.job_stats.pop(item, {})
+                if metrics is not None and job_stats:
+                    metrics.add_stage_time('zoho_queue', job_stats['queue_seconds'], key)
+                    metrics.record_page(key, polls=job_stats['polls'])
+                if checkpoint is not None:
+                    checkpoint.update_page(key, state=current_state, more_records=more_records, count=status_info.get('count') if status_info else None)
+
+                if current_state != 'COMPLETED':
+                    logger.error(f"BACKFILL: El trabajo {job_id} del rango {key} terminó con estado '{current_state}'.")
+                    failed.append(key)
+                    continue
+                if more_records and can_split(item):
+                    # El rango supera el límite de registros por trabajo: se divide y se descarta este resultado
+                    logger.info(f"BACKFILL: El rango {key} tiene más de una página. Se divide en dos.")
+                    pending.extend(split(item))
+                    continue
+
+                download_start = time.perf_counter()
+                content = _download_page(job_id, key, checkpoint)
+                if not content:
+                    logger.error(f"BACKFILL: No se pudo descargar el rango {key} (Job ID {job_id}).")
+                    failed.append(key)
+                    continue
+                if metrics is not None:
+                    metrics.add_stage_time('download', time.perf_counter() - download_start, key)
+                    metrics.record_page(key, bytes=content.getbuffer().nbytes)
+                if more_records:
+                    # Rango de duración mínima con más registros: se pide la siguiente página del mismo rango
+                    pending.append((item[0], item[1], item[2] + 1))
+                logger.info(f"BACKFILL: Rango {key} descargado ({status_info.get('count')} registros).")
+                yield key, content
+    finally:
+        # Liberar los cupos de los trabajos que quedaron en vuelo si el consumidor se detuvo o hubo un error
+        for _ in in_flight:
+            release_slot()
+
+    logger.info(f"BACKFILL: Consultas de estado realizadas: {poller.poll_count}")
+    if metrics is not None:
+        metrics.increment('status_polls', poller.poll_count)
+    if failed:
+        raise IncompleteExtractionError(f"El backfill de {module_api_name} no pudo extraer los rangos {failed}.")
+
+
+def iter_backfill_pages(module_api_name: str, client_id: str, client_secret: str, refresh_token: str, user_email: str, start: str, end: str = None, initial_slices: int = DEFAULT_INITIAL_SLICES, min_slice_minutes: float = DEFAULT_MIN_SLICE_MINUTES, created_column_date: str = "Created_Time", updated_column_date: str = "Modified_Time", max_concurrent_jobs: int = ZOHO_MAX_CONCURRENT_JOBS, job_slots=None, checkpoint: ExtractionCheckpoint = None, metrics: PipelineMetrics = None, fields: list = None):
+    """
+    Extracción completa de un módulo en paralelo por rangos de fecha de creación, para módulos que
+    superan el límite de 200.000 registros por trabajo. Inicializa el SDK y genera (clave, BytesIO)
+    por cada rango descargado, igual que iter_zoho_pages; las claves ordenan los rangos cronológicamente.
+
+    Args:
+        module_api_name (str): nombre del modulo de zoho
+        start (str): fecha ISO 8601 anterior al primer registro del módulo (por ejemplo la fecha de alta de la organización)
+        end (str): fin del rango (exclusivo); por defecto la medianoche del día siguiente
+        initial_slices (int): rangos en que se divide el módulo al empezar
+        min_slice_minutes (float): duración mínima de un rango antes de paginarlo en lugar de dividirlo
+        max_concurrent_jobs (int): número máximo de trabajos de Bulk Read en vuelo a la vez (tope: ZOHO_MAX_CONCURRENT_JOBS)
+        job_slots (threading.Semaphore): cupos globales de trabajos compartidos entre módulos
+        checkpoint (ExtractionCheckpoint): manifiesto para reanudar el backfill a partir de los rangos ya descargados
+        metrics (PipelineMetrics): métricas de la ejecución
+        fields (list): api_names de los campos a exportar; Id y las columnas de fecha se agregan siempre. None exporta todos.
+    """
+    max_concurrent_jobs = max(1, min(max_concurrent_jobs, ZOHO_MAX_CONCURRENT_JOBS))
+    end = end or default_backfill_end()
+    logger.info(f"\n--- INICIANDO BACKFILL DE ZOHO PARA: {module_api_name} ({start} a {end}, {initial_slices} rangos, {max_concurrent_jobs} trabajos en vuelo) ---")
+    initialize_zoho_sdk(client_id, client_secret, refresh_token, user_email)
+    yield from _iter_slices(module_api_name, start, end, initial_slices, min_slice_minutes, created_column_date, updated_column_date, max_concurrent_jobs, job_slots, checkpoint, metrics,
+                            select_fields(fields, created_column_date, updated_column_date))
@@ -0,0 +1,151 @@
+import hashlib #identificar la extracción y verificar los archivos descargados
+import io #devolver las páginas guardadas en memoria
+import json #el manifiesto se guarda como json
+import os #carpetas y archivos de la extracción
+import re #nombres de archivo seguros para las páginas
+import shutil #borrar la extracción al terminar
+import threading #evitar escrituras simultaneas del manifiesto
+import time #antigüedad de los trabajos de Zoho
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("checkpoint")
+
+# Carpeta donde se guardan los manifiestos y las páginas descargadas de cada extracción
+DEFAULT_CHECKPOINT_DIR = os.path.join("/tmp", "zoho_etl_state", "checkpoints")
+# Zoho conserva el resultado de un trabajo de Bulk Read durante un día; se deja un margen
+DEFAULT_MAX_AGE_HOURS = 23
+
+
+def file_checksum(path: str) -> str:
+    """Calcula el sha256 de un archivo leyéndolo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionCheckpoint:
+    """
+    Manifiesto de una extracción de Bulk Read que permite reanudarla si el proceso falla.
+    Por cada página guarda el job_id, el estado, more_records, la ruta de la descarga en disco
+    y su checksum. Un reintento con la misma consulta (módulo, columnas y fecha de inicio)
+    reutiliza las páginas ya descargadas y los trabajos que Zoho todavía conserva, y solo
+    crea trabajos para las páginas que faltan.
+    """
+
+    def __init__(self, module_api_name: str, criteria_date: str, created_column_date: str = "Created_Time", updated_column_date: str = "Modified_Time", base_dir: str = None, max_age_hours: float = DEFAULT_MAX_AGE_HOURS, variant: str = None, fields: list = None):
+        """
+        Args:
+            module_api_name (str): nombre del modulo de zoho
+            criteria_date (str): fecha de inicio del filtro de la consulta, o None si se extraen todos los datos
+            created_column_date (str): nombre de la columna de fecha de creación
+            updated_column_date (str): nombre de la columna de fecha de actualización
+            base_dir (str): carpeta donde se guardan las extracciones; por defecto DEFAULT_CHECKPOINT_DIR
+            max_age_hours (float): antigüedad máxima de la extracción antes de descartarla y empezar de nuevo
+            variant (str): distingue extracciones con otra forma de paginar (por ejemplo un backfill por rangos)
+            fields (list): campos exportados; una extracción con otros campos no reutiliza las páginas
+        """
+        self.module_api_name = module_api_name
+        self.criteria = {'criteria_date': criteria_date, 'created_column_date': created_column_date, 'updated_column_date': updated_column_date}
+        if variant is not None:
+            self.criteria['variant'] = variant
+        if fields:
+            self.criteria['fields'] = sorted(fields)
+        run_key = hashlib.sha256(json.dumps(self.criteria, sort_keys=True).encode()).hexdigest()[:16]
+        self.directory = os.path.join(base_dir or DEFAULT_CHECKPOINT_DIR, module_api_name, run_key)
+        self.manifest_path = os.path.join(self.directory, "manifest.json")
+        self.max_age_seconds = max_age_hours * 3600
+        self._lock = threading.Lock()
+        self.manifest = self._load()
+
+    def _new_manifest(self) -> dict:
+        return {'module': self.module_api_name, 'criteria': self.criteria, 'created_at': time.time(), 'pages': {}}
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return self._new_manifest()
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"AVISO: No se pudo leer el manifiesto {self.manifest_path}. Se empezará de nuevo. Causa: {e}")
+            self.clear()
+            return self._new_manifest()
+        # Pasado el tiempo de retención de Zoho la extracción ya no es consistente con los trabajos nuevos
+        if time.time() - manifest.get('created_at', 0) > self.max_age_seconds:
+            logger.info(f"La extracción guardada de '{self.module_api_name}' expiró. Se empezará de nuevo.")
+            self.clear()
+            return self._new_manifest()
+        logger.info(f"Reanudando la extracción de '{self.module_api_name}': {len(manifest['pages'])} páginas en el manifiesto.")
+        return manifest
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def get_page(self, page: int) -> dict:
+        """Retorna la entrada del manifiesto de la página, o None si la página no tiene trabajo."""
+        return self.manifest['pages'].get(str(page))
+
+    def update_page(self, page: int, **fields):
+        """Actualiza la entrada de la página (job_id, state, more_records, count, spool_path, checksum) y guarda el manifiesto."""
+        with self._lock:
+            self.manifest['pages'].setdefault(str(page), {}).update(fields)
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"AVISO: No se pudo guardar el manifiesto {self.manifest_path}. Causa: {e}")
+
+    def mark_loaded(self, page, **fields):
+        """
+        Marca la página como cargada a BigQuery y borra su descarga del disco; un reintento
+        ya no la vuelve a extraer ni a cargar. fields se guarda en la entrada (por ejemplo la marca de agua).
+        """
+        path = (self.get_page(page) or {}).get('spool_path')
+        self.update_page(page, state='LOADED', spool_path=None, checksum=None, **fields)
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def is_loaded(self, page) -> bool:
+        """Indica si la página ya se cargó a BigQuery en una ejecución anterior."""
+        entry = self.get_page(page)
+        return bool(entry and entry.get('state') == 'LOADED')
+
+    def loaded_watermarks(self) -> list:
+        """Marcas de agua registradas por las páginas ya cargadas."""
+        with self._lock:
+            return [entry['watermark'] for entry in self.manifest['pages'].values() if entry.get('state') == 'LOADED' and entry.get('watermark')]
+
+    def job_is_reusable(self, page: int) -> bool:
+        """Indica si el trabajo de la página todavía se puede consultar y descargar en Zoho."""
+        entry = self.get_page(page)
+        return bool(entry and entry.get('job_id') and entry.get('state') not in ('FAILED', 'DELETED', 'SKIPPED', 'LOADED')
+                    and time.time() - entry.get('created_at', 0) < self.max_age_seconds)
+
+    def spool_path(self, page) -> str:
+        """Ruta del archivo en disco donde se descarga la página (un número o la clave de un rango)."""
+        return os.path.join(self.directory, f"page_{re.sub(r'[^0-9A-Za-z_-]', '_', str(page))}.zip")
+
+    def load_page(self, page: int) -> io.BytesIO:
+        """
+        Retorna el contenido de la página ya descargada, o None si no está en disco
+        o su checksum no coincide con el del manifiesto.
+        """
+        entry = self.get_page(page)
+        if not entry or entry.get('state') != 'DOWNLOADED':
+            return None
+        path = entry.get('spool_path')
+        if not path or not os.path.exists(path) or file_checksum(path) != entry.get('checksum'):
+            logger.warning(f"AVISO: La descarga guardada de la página {page} no existe o está corrupta. Se volverá a descargar.")
+            return None
+        with open(path, 'rb') as f:
+            return io.BytesIO(f.read())
+
+    def clear(self):
+        """Borra el manifiesto y las páginas descargadas; se llama cuando la carga terminó con éxito."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.manifest = self._new_manifest()
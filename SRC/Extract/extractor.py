@@ -1,37 +1,65 @@
-# Importaciones necesarias del SDK de Zoho
-from zcrmsdk.src.com.zoho.crm.api.bulk_read import *
-from zcrmsdk.src.com.zoho.crm.api.util import Choice
-from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
-from zcrmsdk.src.com.zoho.api.authenticator.store import FileStore
-from zcrmsdk.src.com.zoho.crm.api.dc import USDataCenter
-from zcrmsdk.src.com.zoho.crm.api.sdk_config import SDKConfig
-from zcrmsdk.src.com.zoho.crm.api.user_signature import UserSignature
-from zcrmsdk.src.com.zoho.api.authenticator.oauth_token import OAuthToken, TokenType
-from zcrmsdk.src.com.zoho.crm.api.exception import SDKException
-from zcrmsdk.src.com.zoho.api.logger import Logger
+# Las clases del SDK de Zoho se importan dentro de cada función que las usa, para que importar
+# este módulo (y main.py) no cargue todo el SDK en el arranque en frío
 
 import os #crear carpetas temporales necesarias para zoho
-import time #tiempo de espera entre solicitudes
+import threading #inicializar el SDK una sola vez cuando varios módulos corren en paralelo
+import time #antigüedad del cache de metadatos de campos
 import io #para leer el archivo en memoria
-from datetime import datetime, timedelta #para crear las fechas de consultas de fecha en caso de que full_data sea false
+import json #cache local de los metadatos de campos
+import hashlib #checksum de las páginas descargadas en disco
+from datetime import datetime, timedelta, timezone #para crear las fechas de consultas de fecha en caso de que full_data sea false
 from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+from SRC.Extract.poller import JobPoller #consulta adaptativa del estado de los trabajos
+from SRC.Extract.checkpoint import ExtractionCheckpoint #reanudar extracciones a partir de las páginas ya descargadas
+from SRC.helper.metrics import PipelineMetrics #tiempos de cola, consultas y bytes por página
+from SRC.helper.startup import record_startup_time #tiempo de inicialización del SDK
+from SRC.helper.retry import RetryableError, RetryPolicy, TokenBucket, call_with_retry, retry_after_from_headers, RETRYABLE_STATUS_CODES #reintentos y límite de peticiones
 
 #Configuramos el logger con el nombre del archivo
 logger = setup_logger("extractor")
 
+# Zona horaria de la organización de Zoho, usada para los filtros por periodo
+ZOHO_TIMEZONE = timezone(timedelta(hours=-5))
+
 # --- Lógica del SDK de Zoho
 
-def initialize_zoho_sdk(client_id: str, client_secret: str, refresh_token: str, user_email: str):
+# Credenciales con las que ya se inicializó el SDK en este proceso
+_initialized_sdk_key = None
+_sdk_lock = threading.Lock()
+
+def initialize_zoho_sdk(client_id: str, client_secret: str, refresh_token: str, user_email: str, force: bool = False):
     """
     Inicializa el SDK de Zoho con las credenciales proporcionadas.
     Gestiona la creación de directorios para tokens y logs.
+    Si el SDK ya se inicializó en este proceso con las mismas credenciales no se vuelve a
+    inicializar, de modo que varios módulos comparten la configuración y el almacén de tokens.
     Args:
         client_id (str): id_cliente de zoho
         client_secret (str): id_cliente_secreto de zoho
         refresh_token (str): refresh token para crear los acces tokens de zoho
         user_email (str): email del creador de la app de zoho
+        force (bool): inicializar de nuevo aunque ya se haya hecho con las mismas credenciales
 
     """
+    global _initialized_sdk_key
+    sdk_key = (client_id, client_secret, refresh_token, user_email)
+    with _sdk_lock:
+        if not force and _initialized_sdk_key == sdk_key:
+            return
+        start = time.perf_counter()
+        _initialize_zoho_sdk(client_id, client_secret, refresh_token, user_email)
+        _initialized_sdk_key = sdk_key
+        record_startup_time("zoho_sdk_init", time.perf_counter() - start)
+
+def _initialize_zoho_sdk(client_id: str, client_secret: str, refresh_token: str, user_email: str):
+    from zcrmsdk.src.com.zoho.crm.api.initializer import Initializer
+    from zcrmsdk.src.com.zoho.api.authenticator.store import FileStore
+    from zcrmsdk.src.com.zoho.crm.api.dc import USDataCenter
+    from zcrmsdk.src.com.zoho.crm.api.sdk_config import SDKConfig
+    from zcrmsdk.src.com.zoho.crm.api.user_signature import UserSignature
+    from zcrmsdk.src.com.zoho.api.authenticator.oauth_token import OAuthToken, TokenType
+    from zcrmsdk.src.com.zoho.crm.api.exception import SDKException
+    from zcrmsdk.src.com.zoho.api.logger import Logger
     try:
         logger.info("Inicializando el SDK de Zoho...")
         user = UserSignature(email=user_email)
@@ -63,7 +91,51 @@ def initialize_zoho_sdk(client_id: str, client_secret: str, refresh_token: str,
         logger.exception(f"Error inesperado al inicializar el SDK: {e}")
         raise # Relanzar para que el orquestador sepa que falló
 
-def create_bulk_read_job(module_api_name: str, page: int, full_data: bool, created_column_date:str, updated_column_date:str,period: int):
+# Límite de peticiones del lado del cliente, compartido por todos los módulos del proceso,
+# para no agotar los créditos del API de Zoho con ráfagas de consultas de estado
+ZOHO_REQUESTS_PER_SECOND = 2
+ZOHO_REQUESTS_BURST = 10
+ZOHO_RATE_LIMITER = TokenBucket(rate=ZOHO_REQUESTS_PER_SECOND, capacity=ZOHO_REQUESTS_BURST)
+ZOHO_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=2, max_delay=60, max_total_seconds=300)
+
+def _check_response(response, description: str):
+    """Lanza RetryableError si Zoho respondió con un límite de peticiones o un error temporal (429, 5xx)."""
+    if response is not None and response.get_status_code() in RETRYABLE_STATUS_CODES:
+        raise RetryableError(f"{description}: código de estado {response.get_status_code()}", retry_after_from_headers(response.get_headers()))
+    return response
+
+def _call_zoho(func, *args, description: str = ""):
+    """
+    Ejecuta una llamada al SDK de Zoho respetando el limitador de peticiones y reintentando
+    los errores temporales (límite de peticiones, errores 5xx, red) con ZOHO_RETRY_POLICY.
+    Los errores fatales se relanzan sin reintentar.
+    """
+    return call_with_retry(func, *args, policy=ZOHO_RETRY_POLICY, rate_limiter=ZOHO_RATE_LIMITER, description=description)
+
+def select_fields(fields: list, created_column_date: str = "Created_Time", updated_column_date: str = "Modified_Time") -> list:
+    """
+    Lista de campos a exportar en los trabajos de Bulk Read: los indicados más Id y las columnas de fecha
+    de creación y actualización, que el ETL necesita siempre (llave, filtros y marca de agua), sin repetir.
+    Retorna None si fields está vacío (se exportan todos los campos).
+    """
+    if not fields:
+        return None
+    return list(dict.fromkeys(["Id", created_column_date, updated_column_date, *fields]))
+
+def criteria_start_date(full_data: bool, period: int, since: str = None) -> str:
+    """
+    Fecha ISO 8601 desde la que se filtran los registros (creados o modificados), o None si full_data es True.
+    Con una marca de agua (since) se usa esa fecha; si no, la medianoche de hace `period` días
+    en la zona horaria de la organización de Zoho.
+    """
+    if full_data:
+        return None
+    if since:
+        return since
+    k_days_ago = datetime.now(ZOHO_TIMEZONE) - timedelta(days=period)
+    return k_days_ago.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+
+def create_bulk_read_job(module_api_name: str, page: int, full_data: bool, created_column_date:str, updated_column_date:str,period: int, since: str = None, created_range: tuple = None, fields: list = None):
     """
     Crea un trabajo de Bulk Read en Zoho.
     Retorna el job_id si tiene éxito, de lo contrario None.
@@ -75,7 +147,13 @@ def create_bulk_read_job(module_api_name: str, page: int, full_data: bool, creat
         created_column_date (str): nombre de la columna de fecha de creación
         updated_column_date (str): nombre de la columna de fecha de actualización
         period (int): periodo de días para filtrar los datos si full_data es False
+        since (str): marca de agua ISO 8601 (último Modified_Time cargado); si se indica reemplaza el filtro por period
+        created_range (tuple): (inicio, fin) ISO 8601; si se indica, solo se extraen los registros con
+            inicio <= created_column_date < fin, sin importar full_data (ver SRC/Extract/backfill.py)
+        fields (list): api_names de los campos a exportar (ver select_fields); si es None se exportan todos
     """
+    from zcrmsdk.src.com.zoho.crm.api.bulk_read import BulkReadOperations, RequestWrapper, Query, Criteria, ActionWrapper, SuccessResponse, APIException
+    from zcrmsdk.src.com.zoho.crm.api.util import Choice
     try:
         logger.info(f"Creando trabajo para el módulo '{module_api_name}', página {page}...")
         bulk_read_operations = BulkReadOperations()
@@ -83,13 +161,32 @@ def create_bulk_read_job(module_api_name: str, page: int, full_data: bool, creat
         query = Query()
         query.set_module(module_api_name)
         query.set_page(page)
+        if fields:
+            query.set_fields(fields)
 
-        if not full_data:
-            logger.info("Aplicando criterio de fecha para los últimos 7 días (creado O modificado)...")
-            
-            
-            k_days_ago = datetime.now() - timedelta(days=period)
-            iso_date = k_days_ago.strftime('%Y-%m-%dT00:00:00-05:00')
+        if created_range is not None:
+            range_start, range_end = created_range
+            logger.info(f"Aplicando criterio de creación entre {range_start} y {range_end}...")
+
+            main_criteria_group = Criteria()
+            main_criteria_group.set_group_operator(Choice("and"))
+
+            criteria_from = Criteria()
+            criteria_from.set_api_name(created_column_date)
+            criteria_from.set_comparator(Choice("greater_equal"))
+            criteria_from.set_value(range_start)
+
+            criteria_to = Criteria()
+            criteria_to.set_api_name(created_column_date)
+            criteria_to.set_comparator(Choice("less_than"))
+            criteria_to.set_value(range_end)
+
+            main_criteria_group.set_group([criteria_from, criteria_to])
+            query.set_criteria(main_criteria_group)
+
+        elif not full_data:
+            iso_date = criteria_start_date(full_data, period, since)
+            logger.info(f"Aplicando criterio de fecha desde {iso_date} (creado O modificado)...")
 
             main_criteria_group = Criteria()
             main_criteria_group.set_group_operator(Choice("or"))
@@ -112,7 +209,8 @@ def create_bulk_read_job(module_api_name: str, page: int, full_data: bool, creat
 
         request.set_query(query)
         request.set_file_type(Choice('csv'))
-        response = bulk_read_operations.create_bulk_read_job(request)
+        # Un reintento tras un timeout puede dejar en Zoho un trabajo duplicado; ese trabajo simplemente no se usa
+        response = _call_zoho(lambda: _check_response(bulk_read_operations.create_bulk_read_job(request), "crear trabajo"), description=f"crear trabajo de la página {page}")
 
         if response is not None and isinstance(response.get_object(), ActionWrapper):
             action_response_list = response.get_object().get_data()
@@ -134,13 +232,14 @@ def create_bulk_read_job(module_api_name: str, page: int, full_data: bool, creat
 def get_job_status(job_id: str) -> dict:
     """
     Consulta el estado de un trabajo de Bulk Read en Zoho.
-    Retorna un diccionario con 'state' y opcionalmente 'more_records' si el trabajo ha finalizado.
+    Retorna un diccionario con 'state' y opcionalmente 'more_records' y 'count' si el trabajo ha finalizado.
     Args:
         job_id (str): id del trabajo que creamos en BULKREAD
     """
+    from zcrmsdk.src.com.zoho.crm.api.bulk_read import BulkReadOperations, ResponseWrapper
     try:
         bulk_read_operations = BulkReadOperations()
-        response = bulk_read_operations.get_bulk_read_job_details(job_id)
+        response = _call_zoho(lambda: _check_response(bulk_read_operations.get_bulk_read_job_details(job_id), "consultar estado"), description=f"consultar estado de {job_id}")
 
         if response is not None and isinstance(response.get_object(), ResponseWrapper):
             job_detail = response.get_object().get_data()[0]
@@ -148,130 +247,452 @@ def get_job_status(job_id: str) -> dict:
 
             status_info = {
                 'state': job_detail.get_state().get_value(),
-                'more_records': None
+                'more_records': None,
+                'count': None
             }
             
             # El parámetro 'more_records' solo es fiable cuando el job está completado.
             if result is not None and status_info['state'] == 'COMPLETED':
                 status_info['more_records'] = result.get_more_records()
+                status_info['count'] = result.get_count()
             
             return status_info
     except Exception as e:
         logger.exception(f"ERROR al consultar estado de {job_id}: {e}")
     return None
 
-def download_job_result_in_memory(job_id: str) -> io.BytesIO:
+def _download_job_result(job_id: str, write_stream, destination: str):
     """
-    Descarga el resultado de un job de Zoho y devuelve su contenido binario en un BytesIO.
+    Descarga el resultado de un job de Zoho y entrega los bloques del archivo a write_stream, que los escribe
+    en un buffer o en un archivo. Retorna lo que retorne write_stream si tiene éxito, de lo contrario None.
     Args:
         job_id (str): id del trabajo que creamos en BULKREAD
+        write_stream: función que recibe el iterable de bloques (bytes) y retorna el resultado de la descarga
+        destination (str): descripción del destino para los logs ("memoria" o la ruta del archivo)
     """
-    try:
-        logger.info(f"Descargando resultado para Job ID: {job_id} en memoria...")
+    from zcrmsdk.src.com.zoho.crm.api.bulk_read import BulkReadOperations, FileBodyWrapper, APIException
+    def download():
+        # La petición y la lectura del stream se reintentan juntas: un corte a mitad de la descarga vuelve a empezar
         bulk_read_operations = BulkReadOperations()
-        response = bulk_read_operations.download_result(job_id)
-        
+        response = _check_response(bulk_read_operations.download_result(job_id), "descargar resultado")
+
         if isinstance(response.get_object(), FileBodyWrapper):
             stream_wrapper = response.get_object().get_file()
-            
-            file_content = io.BytesIO()
-            for chunk in stream_wrapper.get_stream():
-                file_content.write(chunk)
-            file_content.seek(0) # Rebovinar para poder leerlo desde el principio
-            
-            logger.info(f"ÉXITO: Job ID {job_id} descargado en memoria.")
-            return file_content
-            
+            result = write_stream(stream_wrapper.get_stream())
+            logger.info(f"ÉXITO: Job ID {job_id} descargado en {destination}.")
+            return result
+
         elif isinstance(response.get_object(), APIException):
             logger.error(f"ERROR API al descargar {job_id}: {response.get_object().get_message().get_value()}")
         else:
             status_code = response.get_status_code()
             logger.error(f"No se pudo descargar {job_id}. Código de estado: {status_code}")
-            
+        return None
+
+    try:
+        logger.info(f"Descargando resultado para Job ID: {job_id} en {destination}...")
+        return _call_zoho(download, description=f"descargar {job_id}")
     except Exception as e:
-        logger.exception(f"ERROR al descargar {job_id} en memoria: {e}")
+        logger.exception(f"ERROR al descargar {job_id} en {destination}: {e}")
     return None
 
 
-# --- 1. Función de Extracción 
-def extract_data_from_zoho(module_api_name: str, client_id: str, client_secret: str, refresh_token: str, user_email: str, full_data: bool , created_column_date: str , updated_column_date: str , period: int) -> list[io.BytesIO]:
+def download_job_result_in_memory(job_id: str) -> io.BytesIO:
+    """
+    Descarga el resultado de un job de Zoho y devuelve su contenido binario en un BytesIO.
+    Args:
+        job_id (str): id del trabajo que creamos en BULKREAD
+    """
+    def write_to_buffer(chunks):
+        file_content = io.BytesIO()
+        for chunk in chunks:
+            file_content.write(chunk)
+        file_content.seek(0) # Rebovinar para poder leerlo desde el principio
+        return file_content
+
+    return _download_job_result(job_id, write_to_buffer, "memoria")
+
+
+def download_job_result_to_file(job_id: str, path: str) -> str:
+    """
+    Descarga el resultado de un job de Zoho directamente a un archivo en disco, sin retenerlo en memoria.
+    Retorna el sha256 del archivo si tiene éxito, de lo contrario None.
+    Args:
+        job_id (str): id del trabajo que creamos en BULKREAD
+        path (str): ruta del archivo destino
+    """
+    def write_to_file(chunks):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256()
+        # Escribir en un archivo temporal y reemplazar, para no dejar descargas a medias con el nombre final
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                digest.update(chunk)
+        os.replace(tmp_path, path)
+        return digest.hexdigest()
+
+    return _download_job_result(job_id, write_to_file, path)
+
+
+# Carpeta donde se guardan los metadatos de campos de cada módulo
+DEFAULT_FIELDS_DIR = os.path.join("/tmp", "zoho_etl_state", "fields")
+_field_types_cache = {}
+
+def get_module_field_types(module_api_name: str, fields_path: str = None, max_age_hours: float = 24) -> dict:
+    """
+    Retorna los tipos de dato de los campos de un módulo de Zoho (api_name -> data_type).
+    Se consulta el API de campos como máximo una vez cada max_age_hours; el resultado se guarda
+    en memoria y en fields_path (por defecto /tmp/zoho_etl_state/fields/<modulo>.json).
+    El SDK debe estar inicializado. Si no se pueden obtener los metadatos retorna un diccionario vacío.
+
+    Args:
+        module_api_name (str): nombre del modulo de zoho
+        fields_path (str): archivo json de los metadatos; un archivo existente con ese formato sirve de fixture local
+        max_age_hours (float): antigüedad máxima del archivo antes de volver a consultar a Zoho; None para no expirar
     """
-    Se conecta a Zoho y extrae datos de forma secuencial.
-    Crea un trabajo, espera a que se complete, lo descarga, y solo entonces
-    revisa si necesita crear un trabajo para la siguiente página.
+    if module_api_name in _field_types_cache:
+        return _field_types_cache[module_api_name]
+
+    fields_path = fields_path or os.path.join(DEFAULT_FIELDS_DIR, f"{module_api_name}.json")
+    if os.path.exists(fields_path) and (max_age_hours is None or time.time() - os.path.getmtime(fields_path) < max_age_hours * 3600):
+        with open(fields_path, 'r') as f:
+            field_types = json.load(f)
+        _field_types_cache[module_api_name] = field_types
+        return field_types
+
+    from zcrmsdk.src.com.zoho.crm.api.fields import FieldsOperations, ResponseWrapper as FieldsResponseWrapper, APIException as FieldsAPIException
+    try:
+        logger.info(f"Consultando los metadatos de campos del módulo '{module_api_name}'...")
+        response = _call_zoho(lambda: _check_response(FieldsOperations(module_api_name).get_fields(), "consultar campos"), description=f"consultar campos de {module_api_name}")
+        if response is not None and isinstance(response.get_object(), FieldsResponseWrapper):
+            field_types = {field.get_api_name(): field.get_data_type() for field in response.get_object().get_fields()}
+            os.makedirs(os.path.dirname(fields_path), exist_ok=True)
+            with open(fields_path, 'w') as f:
+                json.dump(field_types, f, indent=2)
+            _field_types_cache[module_api_name] = field_types
+            logger.info(f"   -> {len(field_types)} campos obtenidos para '{module_api_name}'.")
+            return field_types
+        elif response is not None and isinstance(response.get_object(), FieldsAPIException):
+            logger.error(f"   -> Error en API al consultar campos: {response.get_object().get_message().get_value()}")
+    except Exception as e:
+        logger.exception(f"ERROR al consultar los campos de {module_api_name}: {e}")
+    return {}
+
+
+# Límite de trabajos de Bulk Read que Zoho permite tener en cola/ejecución a la vez por organización
+ZOHO_MAX_CONCURRENT_JOBS = 10
+
+class IncompleteExtractionError(Exception):
+    """Alguna página del módulo no se pudo crear, completar o descargar; los datos extraídos están incompletos."""
+
+
+def _iter_pages(module_api_name: str, full_data: bool, created_column_date: str, updated_column_date: str, period: int, max_concurrent_jobs: int, since: str = None, job_slots=None, checkpoint: ExtractionCheckpoint = None, metrics: PipelineMetrics = None, fields: list = None):
+    """
+    Mantiene hasta `max_concurrent_jobs` trabajos de Bulk Read en vuelo a la vez.
+    Crea de forma especulativa los trabajos de las páginas siguientes mientras no se conozca
+    la última página; cuando un trabajo responde more_records=False, las páginas posteriores
+    que ya estaban en vuelo se ignoran.
+    Genera (pagina, BytesIO) a medida que cada página se descarga, en orden de finalización,
+    de modo que solo se retiene en memoria la página que está procesando el consumidor.
+    Una página completada solo se descarga cuando se sabe que tiene registros (es la primera, la anterior
+    respondió more_records=True o su count es mayor que cero); las posteriores a la última página no se
+    descargan ni se generan. Al terminar retorna la última página (valor de StopIteration), o None.
+    Si alguna página necesaria falló, al final lanza IncompleteExtractionError (después de
+    haber generado todas las páginas que sí se pudieron descargar).
+    job_slots es un semáforo opcional compartido entre módulos: cada trabajo en vuelo ocupa
+    un cupo, para respetar el límite de trabajos simultáneos de Zoho en toda la organización.
+    Los trabajos especulativos que se ignoran siguen corriendo en Zoho, así que con job_slots conservan
+    su cupo y se siguen consultando hasta que terminan, antes de dar por terminada la extracción.
+    Con un checkpoint, cada trabajo y cada descarga se registran en su manifiesto y las páginas se
+    descargan a disco: las páginas ya descargadas en una ejecución anterior se leen del disco y los
+    trabajos que Zoho todavía conserva se vuelven a consultar en lugar de crear trabajos nuevos.
+    Con metrics se registran por página el tiempo en la cola de Zoho, las consultas de estado,
+    los bytes descargados y la duración de la descarga.
+    fields limita los campos exportados por cada trabajo (ver select_fields).
     """
-    logger.info(f"\n--- INICIANDO EXTRACCIÓN SECUENCIAL DE ZOHO PARA: {module_api_name} ---")
-    list_of_zip_bytes = []
+    # La fecha del filtro se fija una sola vez para que todas las páginas usen la misma consulta
+    criteria_date = checkpoint.criteria['criteria_date'] if checkpoint is not None else criteria_start_date(full_data, period, since)
+    in_flight = {} # pagina -> job_id
+    next_page = 1
+    # Última página con registros; None mientras ningún trabajo haya respondido more_records=False
+    last_page = None
+    # Primera página cuyo trabajo no se pudo crear o terminó en error; no se crean páginas posteriores
+    failed_page = None
+    # Páginas completadas en Zoho cuya descarga falló
+    missing_pages = set()
+    # Trabajos ignorados que siguen en vuelo en Zoho y conservan su cupo global hasta terminar: pagina -> job_id
+    draining = {}
+    # more_records de cada página cuyo estado ya se conoce
+    more_records_by_page = {}
+    # Páginas completadas que todavía no se sabe si tienen registros: pagina -> (job_id, status_info, job_stats)
+    parked = {}
+    # El intervalo máximo entre consultas conserva las esperas que se usaban antes (60 s completo, 10 s incremental)
+    poller = JobPoller(module_api_name, full_data, get_job_status, max_interval=60 if full_data else 10)
+
+    def stop_page():
+        # Página máxima que todavía tiene sentido extraer
+        candidates = [p for p in (last_page, failed_page - 1 if failed_page else None) if p is not None]
+        return min(candidates) if candidates else None
+
+    def release_slot():
+        if job_slots is not None:
+            job_slots.release()
+
+    def has_records(page, status_info) -> bool:
+        return page == 1 or bool(more_records_by_page.get(page - 1) or status_info.get('more_records') or status_info.get('count'))
+
+    def download(page, job_id, status_info, job_stats):
+        download_start = time.perf_counter()
+        downloaded_content = _download_page(job_id, page, checkpoint)
+        if downloaded_content:
+            logger.info(f"EXTRACCIÓN: Página {page} (Job ID {job_id}) descargada.")
+            if metrics is not None:
+                download_seconds = time.perf_counter() - download_start
+                page_bytes = downloaded_content.getbuffer().nbytes
+                metrics.add_stage_time('download', download_seconds, page)
+                metrics.record_page(page, bytes=page_bytes)
+                metrics.log_event('page_downloaded', page=page, job_id=job_id, bytes=page_bytes, seconds=round(download_seconds, 3),
+                                  mb_per_second=round(page_bytes / download_seconds / 1e6, 2) if download_seconds else None,
+                                  queue_seconds=round(job_stats.get('queue_seconds', 0), 1), polls=job_stats.get('polls'), record_count=status_info.get('count'))
+            yield page, downloaded_content
+        else:
+            logger.warning(f"EXTRACCIÓN: El trabajo {job_id} se completó pero la descarga falló.")
+            missing_pages.add(page)
+
+    def release_parked():
+        # Descarga las páginas completadas que ya se sabe que tienen registros y descarta las posteriores a la última
+        for page in sorted(parked):
+            job_id, status_info, job_stats = parked[page]
+            if stop_page() is not None and page > stop_page():
+                del parked[page]
+                logger.info(f"EXTRACCIÓN: La página {page} (Job ID {job_id}) es posterior a la última página ({stop_page()}). No se descarga.")
+            elif has_records(page, status_info):
+                del parked[page]
+                yield from download(page, job_id, status_info, job_stats)
 
     try:
-        initialize_zoho_sdk(client_id, client_secret, refresh_token, user_email)
-        page = 1
-        # Empezamos asumiendo que hay al menos una página de registros.
-        more_records_exist = True
-
-        while more_records_exist:
-            # 1. Crear un único trabajo para la página actual
-            logger.info(f"EXTRACCIÓN: Creando trabajo para la página {page}...")
-            job_id = create_bulk_read_job(module_api_name, page, full_data, created_column_date, updated_column_date, period)
-            
-            if not job_id:
-                logger.error(f"EXTRACCIÓN: No se pudo crear el trabajo para la página {page}. Abortando.")
+        while True:
+            # 1. Llenar los cupos libres con trabajos para las páginas siguientes
+            while len(in_flight) < max_concurrent_jobs and (stop_page() is None or next_page <= stop_page()):
+                # Páginas ya cargadas a BigQuery en una ejecución anterior: solo se conserva su more_records
+                if checkpoint is not None and checkpoint.is_loaded(next_page):
+                    page, next_page = next_page, next_page + 1
+                    logger.info(f"EXTRACCIÓN: Página {page} ya cargada en una ejecución anterior. Se omite.")
+                    more_records_by_page[page] = bool(checkpoint.get_page(page).get('more_records'))
+                    if not checkpoint.get_page(page).get('more_records'):
+                        last_page = page if last_page is None else min(last_page, page)
+                    if metrics is not None:
+                        metrics.increment('pages_already_loaded')
+                    continue
+                # Páginas ya descargadas en una ejecución anterior
+                spooled_content = checkpoint.load_page(next_page) if checkpoint is not None else None
+                if spooled_content is not None:
+                    page, next_page = next_page, next_page + 1
+                    logger.info(f"EXTRACCIÓN: Página {page} recuperada del disco (Job ID {checkpoint.get_page(page)['job_id']}).")
+                    more_records_by_page[page] = bool(checkpoint.get_page(page).get('more_records'))
+                    if not checkpoint.get_page(page).get('more_records'):
+                        last_page = page if last_page is None else min(last_page, page)
+                    if metrics is not None:
+                        metrics.record_page(page, bytes=spooled_content.getbuffer().nbytes)
+                        metrics.increment('pages_from_checkpoint')
+                        metrics.log_event('page_restored', page=page, bytes=spooled_content.getbuffer().nbytes)
+                    yield page, spooled_content
+                    continue
+                # Sin cupo global: si no hay nada en vuelo se espera un cupo, si no se sigue consultando
+                if job_slots is not None and not job_slots.acquire(blocking=not in_flight):
+                    break
+                # Trabajos de una ejecución anterior que Zoho todavía conserva
+                if checkpoint is not None and checkpoint.job_is_reusable(next_page):
+                    job_id = checkpoint.get_page(next_page)['job_id']
+                    logger.info(f"EXTRACCIÓN: Retomando el Job ID {job_id} de la página {next_page}.")
+                    in_flight[next_page] = job_id
+                    poller.add(next_page, job_id, first_wait=0)
+                    next_page += 1
+                    continue
+                logger.info(f"EXTRACCIÓN: Creando trabajo para la página {next_page} ({len(in_flight) + 1}/{max_concurrent_jobs} en vuelo)...")
+                job_id = create_bulk_read_job(module_api_name, next_page, full_data, created_column_date, updated_column_date, period, criteria_date, fields=fields)
+                if not job_id:
+                    logger.error(f"EXTRACCIÓN: No se pudo crear el trabajo para la página {next_page}. No se crearán más páginas.")
+                    failed_page = next_page
+                    release_slot()
+                    break
+                in_flight[next_page] = job_id
+                poller.add(next_page, job_id)
+                if checkpoint is not None:
+                    checkpoint.update_page(next_page, job_id=job_id, state='CREATED', created_at=time.time(), more_records=None, count=None, spool_path=None, checksum=None)
+                next_page += 1
+
+            # Descartar páginas especulativas que quedaron por encima de la última página
+            for page in [p for p in in_flight if stop_page() is not None and p > stop_page()]:
+                logger.info(f"EXTRACCIÓN: Ignorando el Job ID {in_flight[page]} de la página {page}, posterior a la última página ({stop_page()}).")
+                if job_slots is not None:
+                    # El trabajo sigue ocupando un cupo de Zoho: se libera cuando termine
+                    draining[page] = in_flight[page]
+                else:
+                    poller.remove(page)
+                    release_slot()
+                del in_flight[page]
+
+            yield from release_parked()
+            if not in_flight and not draining:
                 break
 
-            # 2. Monitorear ESE trabajo hasta que se complete o falle
-            logger.info(f"EXTRACCIÓN: Monitoreando Job ID {job_id} hasta su finalización...")
-            final_status = None
-            while True:
-                status_info = get_job_status(job_id)
+            # 2. Consultar en un solo bucle los trabajos en vuelo a los que les toca revisión
+            for page, job_id, status_info in poller.poll():
+                release_slot()
+                if page in draining:
+                    del draining[page]
+                    poller.job_stats.pop(page, None)
+                    logger.info(f"EXTRACCIÓN: El Job ID {job_id} ignorado de la página {page} terminó. Se libera su cupo.")
+                    continue
+                del in_flight[page]
                 if not status_info:
-                    logger.error(f"EXTRACCIÓN: No se pudo obtener el estado para Job ID {job_id}. Abortando.")
-                    # Marcamos como que no hay más registros para salir del bucle principal
-                    more_records_exist = False
-                    break
-                
-                current_state = status_info.get('state')
-                logger.info(f"EXTRACCIÓN: Estado actual del Job ID {job_id} es '{current_state}'.")
+                    logger.error(f"EXTRACCIÓN: No se pudo obtener el estado para Job ID {job_id} (página {page}).")
+                    current_state = 'FAILED'
+                else:
+                    current_state = status_info.get('state')
+                    logger.info(f"EXTRACCIÓN: Estado final del Job ID {job_id} (página {page}) es '{current_state}'.")
+                job_stats = poller.job_stats.pop(page, {})
+                if metrics is not None and job_stats:
+                    metrics.add_stage_time('zoho_queue', job_stats['queue_seconds'], page)
+                    metrics.record_page(page, polls=job_stats['polls'])
+                if checkpoint is not None:
+                    checkpoint.update_page(page, state=current_state, more_records=status_info.get('more_records') if status_info else None, count=status_info.get('count') if status_info else None)
 
                 if current_state == 'COMPLETED':
-                    final_status = status_info
-                    break
-                
-                if current_state in ['FAILED', 'DELETED', 'SKIPPED']:
-                    logger.error(f"EXTRACCIÓN: El trabajo {job_id} terminó con estado '{current_state}'.")
-                    more_records_exist = False
-                    break
-                
-                # Esperar antes de volver a consultar
-                wait_time = 60 if full_data else 10
-                time.sleep(wait_time)
-
-            # 3. Si el trabajo se completó, proceder a la descarga y a la comprobación
-            if final_status and final_status['state'] == 'COMPLETED':
-                logger.info(f"EXTRACCIÓN: Trabajo {job_id} completado. Descargando resultados...")
-                
-                # Descargar el archivo
-                downloaded_content = download_job_result_in_memory(job_id)
-                if downloaded_content:
-                    list_of_zip_bytes.append(downloaded_content)
-                    logger.info(f"EXTRACCIÓN: Job ID {job_id} descargado y añadido a la lista.")
+                    more_records_by_page[page] = bool(status_info.get('more_records'))
+                    if not status_info.get('more_records'):
+                        logger.info(f"EXTRACCIÓN: La página {page} es la última página con registros.")
+                        last_page = page if last_page is None else min(last_page, page)
+                    # Se descarga al confirmar que tiene registros (ver release_parked)
+                    parked[page] = (job_id, status_info, job_stats)
                 else:
-                    logger.warning(f"EXTRACCIÓN: El trabajo {job_id} se completó pero la descarga falló.")
-
-                # 4. AHORA SÍ, revisar si hay más páginas para la siguiente iteración
-                # El valor de more_records en final_status es ahora fiable.
-                more_records_exist = final_status.get('more_records')
-                logger.info(f"EXTRACCIÓN: ¿Hay más registros después de la página {page}? -> {more_records_exist}")
-
-            # Incrementar la página para la siguiente vuelta del bucle (si aplica)
-            page += 1
-            # Pequeña pausa antes de crear el siguiente trabajo si es necesario
-            if more_records_exist:
-                time.sleep(2)
-        
+                    logger.error(f"EXTRACCIÓN: El trabajo {job_id} de la página {page} terminó con estado '{current_state}'. No se extraerán páginas posteriores.")
+                    failed_page = page if failed_page is None else min(failed_page, page)
+            yield from release_parked()
+    finally:
+        # Liberar los cupos de los trabajos que quedaron en vuelo si el consumidor se detuvo o hubo un error
+        for _ in [*in_flight, *draining]:
+            release_slot()
+
+    logger.info(f"EXTRACCIÓN: Consultas de estado realizadas: {poller.poll_count}")
+    if metrics is not None:
+        metrics.increment('status_polls', poller.poll_count)
+
+    # Las fallas en páginas posteriores a la última página real no afectan los datos
+    if failed_page is not None and (last_page is None or failed_page <= last_page):
+        raise IncompleteExtractionError(f"La extracción de {module_api_name} se detuvo en la página {failed_page}.")
+    missing_pages = sorted(p for p in missing_pages if last_page is None or p <= last_page)
+    if missing_pages:
+        raise IncompleteExtractionError(f"No se pudieron descargar las páginas {missing_pages} de {module_api_name}.")
+    return last_page
+
+
+def _download_page(job_id: str, page: int, checkpoint: ExtractionCheckpoint = None) -> io.BytesIO:
+    """Descarga una página en memoria o, con checkpoint, a disco registrándola en el manifiesto."""
+    if checkpoint is None:
+        return download_job_result_in_memory(job_id)
+    spool_path = checkpoint.spool_path(page)
+    checksum = download_job_result_to_file(job_id, spool_path)
+    if not checksum:
+        return None
+    checkpoint.update_page(page, state='DOWNLOADED', spool_path=spool_path, checksum=checksum)
+    with open(spool_path, 'rb') as f:
+        return io.BytesIO(f.read())
+
+
+def iter_zoho_pages(module_api_name: str, client_id: str, client_secret: str, refresh_token: str, user_email: str, full_data: bool, created_column_date: str, updated_column_date: str, period: int, max_concurrent_jobs: int = 1, since: str = None, job_slots=None, checkpoint: ExtractionCheckpoint = None, metrics: PipelineMetrics = None, fields: list = None):
+    """
+    Versión en streaming de la extracción: inicializa el SDK y genera (pagina, BytesIO)
+    por cada página apenas se descarga, para que el consumidor la transforme y cargue
+    antes de que se retenga la siguiente. Los errores se propagan al consumidor; si alguna
+    página falló se lanza IncompleteExtractionError al terminar.
+
+    Args:
+        module_api_name (str): nombre del modulo de zoho
+        max_concurrent_jobs (int): número máximo de trabajos de Bulk Read en vuelo a la vez (tope: ZOHO_MAX_CONCURRENT_JOBS)
+        since (str): marca de agua ISO 8601; si se indica y full_data es False, reemplaza el filtro por period
+        job_slots (threading.Semaphore): cupos globales de trabajos compartidos entre módulos
+        checkpoint (ExtractionCheckpoint): manifiesto para reanudar la extracción a partir de las páginas ya descargadas
+        metrics (PipelineMetrics): métricas de la ejecución (cola de Zoho, consultas, bytes y tiempo de descarga por página)
+        fields (list): api_names de los campos a exportar; Id y las columnas de fecha se agregan siempre. None exporta todos.
+    """
+    if max_concurrent_jobs > ZOHO_MAX_CONCURRENT_JOBS:
+        logger.warning(f"AVISO: max_concurrent_jobs={max_concurrent_jobs} supera el límite de Zoho. Se usará {ZOHO_MAX_CONCURRENT_JOBS}.")
+        max_concurrent_jobs = ZOHO_MAX_CONCURRENT_JOBS
+    max_concurrent_jobs = max(1, max_concurrent_jobs)
+
+    mode = "SECUENCIAL" if max_concurrent_jobs == 1 else f"CONCURRENTE ({max_concurrent_jobs} trabajos en vuelo)"
+    logger.info(f"\n--- INICIANDO EXTRACCIÓN {mode} DE ZOHO PARA: {module_api_name} ---")
+
+    initialize_zoho_sdk(client_id, client_secret, refresh_token, user_email)
+    fields = select_fields(fields, created_column_date, updated_column_date)
+    if fields:
+        logger.info(f"Se exportarán {len(fields)} campos de {module_api_name}.")
+    # Retorna la última página con registros (valor de StopIteration), que usa collect_pages
+    return (yield from _iter_pages(module_api_name, full_data, created_column_date, updated_column_date, period, max_concurrent_jobs, since, job_slots, checkpoint, metrics, fields))
+
+
+# --- 1. Función de Extracción 
+def extract_data_from_zoho(module_api_name: str, client_id: str, client_secret: str, refresh_token: str, user_email: str, full_data: bool , created_column_date: str , updated_column_date: str , period: int, max_concurrent_jobs: int = 1, since: str = None, allow_partial: bool = True, job_slots=None, checkpoint: ExtractionCheckpoint = None, metrics: PipelineMetrics = None, fields: list = None, with_keys: bool = False) -> list:
+    """
+    Se conecta a Zoho y extrae los datos del módulo página por página.
+    Con max_concurrent_jobs=1 la extracción es secuencial: crea un trabajo, espera a que se complete,
+    lo descarga, y solo entonces revisa si necesita crear un trabajo para la siguiente página.
+    Con max_concurrent_jobs>1 mantiene varios trabajos en vuelo para las páginas siguientes.
+
+    Args:
+        max_concurrent_jobs (int): número máximo de trabajos de Bulk Read en vuelo a la vez (tope: ZOHO_MAX_CONCURRENT_JOBS)
+        since (str): marca de agua ISO 8601; si se indica y full_data es False, reemplaza el filtro por period
+        allow_partial (bool): si es True y alguna página falla, se devuelven las páginas que sí se descargaron;
+            si es False la extracción incompleta se trata como fallo y se devuelve una lista vacía.
+        job_slots (threading.Semaphore): cupos globales de trabajos compartidos entre módulos
+        checkpoint (ExtractionCheckpoint): manifiesto de la extracción; si falla, las páginas ya descargadas
+            quedan en disco y un reintento con el mismo checkpoint continúa desde la primera página pendiente.
+        metrics (PipelineMetrics): métricas de la ejecución (cola de Zoho, consultas, bytes y tiempo de descarga por página)
+        fields (list): api_names de los campos a exportar; Id y las columnas de fecha se agregan siempre. None exporta todos.
+        with_keys (bool): devolver pares (pagina, BytesIO) en lugar de solo los ZIPs.
+    """
+    pages = iter_zoho_pages(module_api_name, client_id, client_secret, refresh_token, user_email, full_data, created_column_date, updated_column_date, period, max_concurrent_jobs, since, job_slots, checkpoint, metrics, fields)
+    return collect_pages(pages, module_api_name, allow_partial, with_keys)
+
+
+def collect_pages(pages, module_api_name: str, allow_partial: bool = True, with_keys: bool = False) -> list:
+    """
+    Consume un generador de (pagina, BytesIO) como el de iter_zoho_pages y devuelve los ZIPs ordenados por página,
+    o con with_keys=True los pares (pagina, BytesIO), para registrar las métricas siguientes con la misma página.
+    Se descartan las páginas posteriores a la última página con registros, si el generador la retorna.
+    Si la extracción queda incompleta, devuelve las páginas descargadas cuando allow_partial es True;
+    ante cualquier otro error (o incompleta sin allow_partial) devuelve una lista vacía.
+    """
+    downloaded_pages = []
+    last_page = None
+    try:
+        try:
+            pages = iter(pages)
+            while True:
+                try:
+                    page, content = next(pages)
+                except StopIteration as stop:
+                    # iter_zoho_pages retorna la última página con registros
+                    last_page = stop.value
+                    break
+                downloaded_pages.append((page, content))
+        except IncompleteExtractionError as e:
+            if not allow_partial:
+                raise
+            logger.warning(f"AVISO: Extracción incompleta, se devuelven las páginas descargadas. Causa: {e}")
+        if last_page is not None:
+            downloaded_pages = [(page, content) for page, content in downloaded_pages if page <= last_page]
+        # Las páginas llegan en orden de finalización; se reordenan para conservar el orden original
+        downloaded_pages.sort(key=lambda item: item[0])
+        list_of_zip_bytes = downloaded_pages if with_keys else [content for _, content in downloaded_pages]
         logger.info(f"EXTRACCIÓN: Proceso finalizado. Total de ZIPs en memoria: {len(list_of_zip_bytes)}")
 
     except Exception as e:
         logger.exception(f"ERROR CRÍTICO durante la extracción de Zoho para {module_api_name}: {e}")
         return []
         
-    return list_of_zip_bytes
\ No newline at end of file
+    return list_of_zip_bytes
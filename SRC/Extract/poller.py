@@ -0,0 +1,150 @@
+import json #persistir el historial de tiempos de los trabajos
+import os #crear la carpeta del historial
+import random #jitter en los intervalos de consulta
+import threading #evitar escrituras simultaneas del historial
+import time #medir y esperar entre consultas
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("poller")
+
+# Archivo donde se guarda el tiempo típico de finalización de los trabajos por módulo
+DEFAULT_HISTORY_PATH = os.path.join("/tmp", "zoho_etl_state", "job_history.json")
+# Estados en los que un trabajo de Bulk Read ya no va a cambiar
+FINAL_STATES = ('COMPLETED', 'FAILED', 'DELETED', 'SKIPPED')
+
+_history_lock = threading.Lock()
+
+
+class JobPoller:
+    """
+    Consulta en un único bucle el estado de todos los trabajos de Bulk Read en vuelo.
+    Cada trabajo tiene su propia hora de siguiente consulta: la primera se programa según el
+    tiempo que tardaron los trabajos anteriores del mismo módulo, y las siguientes se
+    espacian con backoff exponencial y jitter hasta max_interval.
+    """
+
+    def __init__(self, module_api_name: str, full_data: bool, status_getter, min_interval: float = 2, max_interval: float = 60, backoff_factor: float = 2, jitter: float = 0.2, history_path: str = DEFAULT_HISTORY_PATH):
+        """
+        Args:
+            module_api_name (str): nombre del modulo de zoho
+            full_data (bool): los trabajos completos e incrementales se aprenden por separado
+            status_getter (callable): función que recibe un job_id y devuelve su estado (get_job_status)
+            min_interval (float): segundos de la primera espera entre consultas
+            max_interval (float): tope de segundos entre consultas
+            backoff_factor (float): factor de crecimiento del intervalo entre consultas
+            jitter (float): variación aleatoria relativa aplicada a cada intervalo
+            history_path (str): archivo json con el historial de tiempos de finalización
+        """
+        self.status_getter = status_getter
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.history_path = history_path
+        self.history_key = f"{module_api_name}|{'full' if full_data else 'incremental'}"
+        self.poll_count = 0
+        self.job_stats = {} # clave -> {'queue_seconds', 'polls'} de los trabajos terminados
+        self._jobs = {} # clave -> {'job_id', 'created_at', 'next_check', 'interval'}
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, key):
+        return key in self._jobs
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _load_history(self) -> dict:
+        if not os.path.exists(self.history_path):
+            return {}
+        try:
+            with open(self.history_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"AVISO: No se pudo leer el historial de trabajos {self.history_path}. Causa: {e}")
+            return {}
+
+    def expected_duration(self) -> float:
+        """Tiempo típico (en segundos) que tardan en completarse los trabajos de este módulo, o 0 si no hay historial."""
+        with _history_lock:
+            entry = self._load_history().get(self.history_key)
+        return entry['avg_seconds'] if entry else 0
+
+    def _record_completion(self, duration: float):
+        """
+        Actualiza el promedio móvil del tiempo de finalización de este módulo y modo (completo o incremental).
+        El número de registros de un trabajo solo se conoce cuando termina, así que no se usa para predecir.
+        """
+        with _history_lock:
+            history = self._load_history()
+            entry = history.get(self.history_key)
+            if entry:
+                # Promedio móvil exponencial para adaptarse a cambios en la cola de Zoho
+                entry['avg_seconds'] = 0.7 * entry['avg_seconds'] + 0.3 * duration
+                entry['samples'] += 1
+            else:
+                entry = {'avg_seconds': duration, 'samples': 1}
+            # Campo de versiones anteriores del historial, que nunca se usó para predecir
+            entry.pop('last_record_count', None)
+            history[self.history_key] = entry
+            try:
+                os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+                with open(self.history_path, 'w') as f:
+                    json.dump(history, f)
+            except OSError as e:
+                logger.warning(f"AVISO: No se pudo guardar el historial de trabajos {self.history_path}. Causa: {e}")
+
+    def add(self, key, job_id: str, first_wait: float = None):
+        """
+        Registra un trabajo recién creado. Su primera consulta se programa un poco antes del
+        tiempo típico de finalización aprendido para el módulo.
+        Con first_wait se fija la espera de la primera consulta (por ejemplo 0 para un trabajo
+        retomado de una ejecución anterior); esos trabajos no se usan para aprender el tiempo típico.
+        """
+        now = time.monotonic()
+        learn = first_wait is None
+        if learn:
+            first_wait = self._jittered(max(self.min_interval, 0.8 * self.expected_duration()))
+        self._jobs[key] = {'job_id': job_id, 'created_at': now, 'next_check': now + first_wait, 'interval': self.min_interval, 'learn': learn, 'polls': 0}
+
+    def remove(self, key):
+        """Deja de monitorear un trabajo (por ejemplo, una página especulativa que ya no se necesita)."""
+        self._jobs.pop(key, None)
+
+    def poll(self) -> list:
+        """
+        Espera hasta que al menos un trabajo deba consultarse, consulta todos los que ya tocan
+        y devuelve los que terminaron como una lista de (clave, job_id, status_info).
+        status_info es None si no se pudo consultar el estado; esos trabajos también se dan por terminados.
+        """
+        if not self._jobs:
+            return []
+
+        wait = min(job['next_check'] for job in self._jobs.values()) - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        finished = []
+        now = time.monotonic()
+        for key, job in list(self._jobs.items()):
+            if job['next_check'] > now:
+                continue
+            self.poll_count += 1
+            job['polls'] += 1
+            status_info = self.status_getter(job['job_id'])
+            current_state = status_info.get('state') if status_info else None
+
+            if status_info is None or current_state in FINAL_STATES:
+                del self._jobs[key]
+                self.job_stats[key] = {'queue_seconds': time.monotonic() - job['created_at'], 'polls': job['polls']}
+                if current_state == 'COMPLETED' and job['learn']:
+                    self._record_completion(time.monotonic() - job['created_at'])
+                finished.append((key, job['job_id'], status_info))
+            else:
+                # Backoff exponencial con jitter hasta el intervalo máximo
+                next_wait = self._jittered(job['interval'])
+                job['next_check'] = time.monotonic() + next_wait
+                logger.info(f"Job ID {job['job_id']} en estado '{current_state}'. Próxima consulta en {next_wait:.0f} s.")
+                job['interval'] = min(self.max_interval, job['interval'] * self.backoff_factor)
+        return finished
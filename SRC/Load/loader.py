@@ -1,41 +1,319 @@
+import tempfile #buffer parquet en memoria que pasa a disco si crece demasiado
+import uuid #nombres únicos para las tablas de staging
+import time #duración de cada carga
+import functools #reutilizar credenciales y clientes entre invocaciones del mismo proceso
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED #cargas en paralelo por lote
 import pandas as pd
-import pandas_gbq
 from SRC.helper.logger_config import setup_logger
-from google.oauth2 import service_account
+from SRC.helper.metrics import PipelineMetrics
+from SRC.helper.startup import import_module, record_startup_time #pandas_gbq y google se importan solo al cargar
 
 logger = setup_logger("load")
 
+# Backends de carga disponibles:
+#   "pandas_gbq": pandas_gbq.to_gbq serializando el DataFrame (comportamiento original)
+#   "parquet": se escribe un buffer Parquet comprimido y se envía como load job de BigQuery con esquema explícito
+LOAD_BACKENDS = ("pandas_gbq", "parquet")
+# Modos de escritura en la tabla destino:
+#   "append": agrega las filas tal cual (comportamiento original)
+#   "merge": carga el lote en una tabla de staging y hace MERGE por Id conservando el Modified_Time más reciente
+WRITE_MODES = ("append", "merge")
+# Tamaño máximo en memoria del buffer Parquet antes de pasarlo a un archivo temporal en /tmp
+PARQUET_SPOOL_MAX_MEMORY = 256 * 1024 * 1024
+# Archivo de la cuenta de servicio de Google Cloud
+CREDENTIALS_PATH = 'Credentials.json'
+
+@functools.lru_cache(maxsize=None)
+def get_credentials(path: str = CREDENTIALS_PATH):
+    """
+    Credenciales de la cuenta de servicio de Credentials.json. Se leen una sola vez por proceso y se
+    reutilizan en las invocaciones en caliente; get_credentials.cache_clear() obliga a leerlas de nuevo.
+    """
+    start = time.perf_counter()
+    service_account = import_module("google.oauth2.service_account")
+    credentials = service_account.Credentials.from_service_account_file(path)
+    record_startup_time("bigquery_credentials", time.perf_counter() - start)
+    return credentials
+
+@functools.lru_cache(maxsize=None)
+def get_bigquery_client(project_id: str):
+    """
+    Crea un cliente de BigQuery autenticado con la cuenta de servicio de Credentials.json.
+    El cliente se crea una vez por proyecto y proceso, y lo comparten los módulos y las invocaciones en caliente.
+
+    Args:
+        project_id (str): Tu ID del proyecto de Google Cloud. Si es None se usa el del archivo de credenciales.
+    """
+    start = time.perf_counter()
+    bigquery = import_module("google.cloud.bigquery")
+    credentials = get_credentials()
+    client = bigquery.Client(project=project_id or credentials.project_id, credentials=credentials)
+    record_startup_time("bigquery_client", time.perf_counter() - start)
+    return client
+
+def _to_gbq(dataframe: pd.DataFrame, destination_table: str, project_id: str):
+    """Carga el DataFrame con pandas_gbq.to_gbq (backend "pandas_gbq"); pandas_gbq se importa solo si se usa este backend."""
+    pandas_gbq = import_module("pandas_gbq")
+    pandas_gbq.to_gbq(
+        dataframe,
+        destination_table=destination_table,
+        project_id=project_id,
+        if_exists='append',
+        progress_bar=False,
+        credentials=get_credentials()
+    )
+
+def get_table_columns(project_id: str, destination_table: str, client=None) -> list:
+    """
+    Columnas de la tabla destino en BigQuery (sin processed_at, que agrega el ETL), o None si la tabla no existe.
+    Se usa para limitar la extracción de Zoho a los campos que ya se cargan.
+    """
+    from google.api_core.exceptions import NotFound
+    client = client or get_bigquery_client(project_id)
+    try:
+        table = client.get_table(destination_table)
+    except NotFound:
+        logger.info(f"La tabla {destination_table} no existe todavía.")
+        return None
+    return [field.name for field in table.schema if field.name != "processed_at"]
+
+def bigquery_schema_from_dataframe(dataframe: pd.DataFrame) -> list:
+    """
+    Construye el esquema de BigQuery a partir de los tipos de las columnas ya limpias del DataFrame.
+    Las columnas de texto y categóricas se cargan como STRING.
+    """
+    from google.cloud import bigquery
+    schema = []
+    for column, dtype in dataframe.dtypes.items():
+        if isinstance(dtype, pd.ArrowDtype) and str(dtype.pyarrow_dtype) == "date32[day]":
+            field_type = "DATE"
+        elif pd.api.types.is_bool_dtype(dtype):
+            field_type = "BOOLEAN"
+        elif pd.api.types.is_integer_dtype(dtype):
+            field_type = "INTEGER"
+        elif pd.api.types.is_float_dtype(dtype):
+            field_type = "FLOAT"
+        elif isinstance(dtype, pd.DatetimeTZDtype):
+            field_type = "TIMESTAMP"
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            field_type = "DATETIME"
+        else:
+            field_type = "STRING"
+        schema.append(bigquery.SchemaField(str(column), field_type, mode="NULLABLE"))
+    return schema
+
+def load_dataframe_as_parquet(dataframe: pd.DataFrame, project_id: str, destination_table: str, client=None, write_disposition: str = "WRITE_APPEND"):
+    """
+    Escribe el DataFrame en un buffer Parquet comprimido y lo envía como load job de BigQuery
+    con un esquema explícito derivado de las columnas. Espera a que el job termine.
+
+    Args:
+        dataframe (pd.DataFrame): El DataFrame que se va a cargar.
+        project_id (str): Tu ID del proyecto de Google Cloud.
+        destination_table (str): La tabla de destino en formato 'dataset_id.table_id'.
+        client: cliente de BigQuery; si no se indica se crea uno con Credentials.json.
+        write_disposition (str): "WRITE_APPEND" o "WRITE_TRUNCATE".
+    """
+    from google.cloud import bigquery
+    if client is None:
+        client = get_bigquery_client(project_id)
+
+    job_config = bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        write_disposition=write_disposition,
+        schema=bigquery_schema_from_dataframe(dataframe),
+    )
+    if write_disposition == "WRITE_APPEND":
+        # Permite que aparezcan columnas nuevas de Zoho sin fallar la carga
+        job_config.schema_update_options = [bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+    with tempfile.SpooledTemporaryFile(max_size=PARQUET_SPOOL_MAX_MEMORY, dir="/tmp") as parquet_buffer:
+        dataframe.to_parquet(parquet_buffer, engine="pyarrow", compression="snappy", index=False)
+        parquet_buffer.seek(0)
+        load_job = client.load_table_from_file(parquet_buffer, destination_table, job_config=job_config, rewind=True)
+        load_job.result()
+    return load_job
+
+def _qualified_table(client, destination_table: str) -> str:
+    """Devuelve la tabla como `proyecto.dataset.tabla` para usarla en SQL."""
+    return destination_table if destination_table.count('.') == 2 else f"{client.project}.{destination_table}"
+
+def merge_dataframe_into_table(dataframe: pd.DataFrame, project_id: str, destination_table: str, key_column: str = "Id", order_column: str = "Modified_Time", client=None):
+    """
+    Carga el DataFrame en una tabla de staging y hace MERGE sobre la tabla destino por key_column:
+    las filas existentes se actualizan solo si el lote trae un order_column igual o más reciente,
+    y las nuevas se insertan. Si la tabla destino no existe se crea con el esquema del staging,
+    y las columnas nuevas del lote se agregan a la tabla destino antes del MERGE.
+
+    Args:
+        dataframe (pd.DataFrame): El DataFrame que se va a cargar (ya sin duplicados por key_column).
+        project_id (str): Tu ID del proyecto de Google Cloud.
+        destination_table (str): La tabla de destino en formato 'dataset_id.table_id'.
+        key_column (str): columna llave del registro.
+        order_column (str): columna de fecha que define la versión más reciente del registro.
+        client: cliente de BigQuery; si no se indica se crea uno con Credentials.json.
+    """
+    if client is None:
+        client = get_bigquery_client(project_id)
+
+    target = _qualified_table(client, destination_table)
+    # Una tabla de staging por lote para que cargas simultáneas no se pisen
+    staging = f"{target}__staging_{uuid.uuid4().hex[:8]}"
+    try:
+        load_dataframe_as_parquet(dataframe, project_id, staging, client, write_disposition="WRITE_TRUNCATE")
+        client.query(f"CREATE TABLE IF NOT EXISTS `{target}` LIKE `{staging}`").result()
+
+        # Agregar a la tabla destino las columnas nuevas que trae el lote
+        target_table = client.get_table(target)
+        existing_columns = {field.name for field in target_table.schema}
+        new_fields = [field for field in client.get_table(staging).schema if field.name not in existing_columns]
+        if new_fields:
+            logger.info(f"Agregando {len(new_fields)} columnas nuevas a '{destination_table}': {[field.name for field in new_fields]}")
+            target_table.schema = list(target_table.schema) + new_fields
+            client.update_table(target_table, ["schema"])
+
+        columns = [f"`{column}`" for column in dataframe.columns]
+        update_set = ", ".join(f"{column} = S.{column}" for column in columns)
+        merge_sql = f"""
+            MERGE `{target}` T
+            USING (
+                SELECT * EXCEPT(_row_number) FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY `{key_column}` ORDER BY `{order_column}` DESC) AS _row_number
+                    FROM `{staging}`
+                ) WHERE _row_number = 1
+            ) S
+            ON T.`{key_column}` = S.`{key_column}`
+            WHEN MATCHED AND (T.`{order_column}` IS NULL OR S.`{order_column}` >= T.`{order_column}`) THEN
+                UPDATE SET {update_set}
+            WHEN NOT MATCHED THEN
+                INSERT ({", ".join(columns)}) VALUES ({", ".join(f"S.{column}" for column in columns)})
+        """
+        merge_job = client.query(merge_sql)
+        merge_job.result()
+        logger.info(f"MERGE completado en '{destination_table}'. Filas afectadas: {merge_job.num_dml_affected_rows}")
+        return merge_job
+    finally:
+        client.delete_table(staging, not_found_ok=True)
+
 # --- 3. Función de Carga ---
-def load_data_to_bigquery(dataframe: pd.DataFrame, project_id: str, destination_table: str):
+def load_data_to_bigquery(dataframe: pd.DataFrame, project_id: str, destination_table: str, backend: str = "pandas_gbq", client=None, write_mode: str = "append", key_column: str = "Id", order_column: str = "Modified_Time", metrics: PipelineMetrics = None, page=None):
     """
     Carga un DataFrame a BigQuery de forma simple, autodetectando el esquema
-    y limpiando los nombres de las columnas.
+    y limpiando los nombres de las columnas. Con backend="parquet" el esquema es explícito
+    y los datos viajan como Parquet comprimido en un load job.
 
     Args:
         dataframe (pd.DataFrame): El DataFrame que se va a cargar.
         project_id (str): Tu ID del proyecto de Google Cloud.
         destination_table (str): La tabla de destino en formato 'dataset_id.table_id'.
+        backend (str): backend de carga, uno de LOAD_BACKENDS.
+        client: cliente de BigQuery para el backend "parquet"; si no se indica se crea uno con Credentials.json.
+        write_mode (str): uno de WRITE_MODES. En modo "merge" el lote siempre pasa por un load job Parquet
+            a una tabla de staging, sin importar el backend.
+        key_column (str): columna llave para el modo "merge".
+        order_column (str): columna de fecha que define la versión más reciente en el modo "merge".
+        metrics (PipelineMetrics): si se indica, registra la duración de la carga y las filas cargadas.
+        page: página de la extracción a la que pertenece el lote; si se indica, la duración se registra también en ella.
     """
+    if backend not in LOAD_BACKENDS:
+        raise ValueError(f"Backend de carga no soportado: '{backend}'. Opciones: {LOAD_BACKENDS}")
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"Modo de escritura no soportado: '{write_mode}'. Opciones: {WRITE_MODES}")
+
     logger.info(f"--- INICIANDO CARGA A BIGQUERY EN LA TABLA: {destination_table} ---")
-    credentials = service_account.Credentials.from_service_account_file('Credentials.json')
     if dataframe.empty:
         logger.warning("AVISO: El DataFrame está vacío. No se cargarán datos.")
         return
     
+    start_time = time.perf_counter()
 
     try:
-        
-        pandas_gbq.to_gbq(
-            dataframe,
-            destination_table=destination_table,
-            project_id=project_id,
-            if_exists='append',
-            progress_bar=False,
-            credentials = credentials  
-        )
-        logger.info(f"Datos cargados correctamente en '{destination_table}'.")
+        if write_mode == "merge":
+            merge_dataframe_into_table(dataframe, project_id, destination_table, key_column, order_column, client)
+        elif backend == "parquet":
+            load_dataframe_as_parquet(dataframe, project_id, destination_table, client)
+        else:
+            _to_gbq(dataframe, destination_table, project_id)
+        logger.info(f"Datos cargados correctamente en '{destination_table}' ({len(dataframe)} filas).")
+        if metrics is not None:
+            seconds = time.perf_counter() - start_time
+            metrics.add_stage_time('load', seconds, page)
+            metrics.increment('rows_loaded', len(dataframe))
+            metrics.log_event('batch_loaded', page=page, rows=len(dataframe), seconds=round(seconds, 3), backend=backend, write_mode=write_mode)
     
 
     except Exception as e:
         logger.exception(f"ERROR: Falló la carga a BigQuery. Causa: {e}")
         raise
+
+def load_batches_to_bigquery(batches, project_id: str, destination_table: str, backend: str = "pandas_gbq", max_workers: int = 1, client=None, write_mode: str = "append", key_column: str = "Id", order_column: str = "Modified_Time", metrics: PipelineMetrics = None, on_loaded=None, with_pages: bool = False) -> int:
+    """
+    Carga una secuencia de DataFrames (por ejemplo, uno por página) a medida que llegan.
+    Con max_workers>1 mantiene hasta max_workers cargas en paralelo; los lotes se consumen de forma
+    perezosa para no retener en memoria más de max_workers lotes a la vez.
+    Retorna el total de filas cargadas. Si alguna carga falla, no se entregan más lotes, se espera a las
+    cargas en curso (on_loaded se llama para las que terminan con éxito) y se relanza la primera excepción.
+
+    Args:
+        batches: iterable de pd.DataFrame, o con with_pages=True de pares (página, pd.DataFrame).
+        project_id (str): Tu ID del proyecto de Google Cloud.
+        destination_table (str): La tabla de destino en formato 'dataset_id.table_id'.
+        backend (str): backend de carga, uno de LOAD_BACKENDS.
+        max_workers (int): número máximo de cargas simultáneas.
+        client: cliente de BigQuery compartido por todas las cargas del backend "parquet" y del modo "merge".
+        write_mode (str): uno de WRITE_MODES. Los MERGE sobre una misma tabla se ejecutan de uno en uno.
+        key_column (str): columna llave para el modo "merge".
+        order_column (str): columna de fecha que define la versión más reciente en el modo "merge".
+        metrics (PipelineMetrics): si se indica, registra la duración de cada carga (con with_pages=True, también por página).
+        on_loaded: si se indica, se llama con la posición del lote (desde 0), o con su página si with_pages=True,
+            cuando su carga termina con éxito.
+        with_pages (bool): si los lotes llegan acompañados de la página de la extracción a la que pertenecen.
+    """
+    if (backend == "parquet" or write_mode == "merge") and client is None:
+        client = get_bigquery_client(project_id)
+    if write_mode == "merge" and max_workers > 1:
+        # BigQuery serializa los DML sobre la misma tabla; en paralelo solo se generarían conflictos
+        logger.warning("AVISO: En modo merge las cargas se ejecutan de una en una.")
+        max_workers = 1
+
+    if not with_pages:
+        batches = ((None, dataframe) for dataframe in batches)
+
+    total_rows = 0
+    if max_workers <= 1:
+        for position, (page, dataframe) in enumerate(batches):
+            load_data_to_bigquery(dataframe, project_id, destination_table, backend, client, write_mode, key_column, order_column, metrics, page)
+            total_rows += len(dataframe)
+            if on_loaded is not None:
+                on_loaded(page if with_pages else position)
+        return total_rows
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {} # future -> (posición del lote, página, filas)
+
+        def finish(done):
+            nonlocal total_rows
+            for future in done:
+                position, page, rows = pending.pop(future)
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                total_rows += rows
+                if on_loaded is not None:
+                    on_loaded(page if with_pages else position)
+
+        try:
+            for position, (page, dataframe) in enumerate(batches):
+                if len(pending) >= max_workers:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    finish(done)
+                    if errors:
+                        break
+                pending[executor.submit(load_data_to_bigquery, dataframe, project_id, destination_table, backend, client, write_mode, key_column, order_column, metrics, page)] = (position, page, len(dataframe))
+        finally:
+            # Las cargas que terminan con éxito se registran aunque otra haya fallado, para no repetirlas al reanudar
+            done, _ = wait(pending)
+            finish(sorted(done, key=lambda future: pending[future][0]))
+    if errors:
+        raise errors[0]
+    return total_rows
@@ -0,0 +1,215 @@
+import json #persistir los tipos decididos por módulo
+import os #carpeta de los tipos, junto al mapeo de columnas
+import threading #varios hilos pueden tipar lotes del mismo módulo
+import numpy as np #enteros exactos con máscara de nulos
+import pandas as pd #conversión de tipos de las columnas
+import pyarrow as pa #fechas sin hora (date32), que se cargan como DATE
+import SRC.Transform.schema_mapping as schema_mapping #los tipos se guardan junto al mapeo de columnas
+from SRC.helper.logger_config import setup_logger #informacion relevante a la consola
+
+logger = setup_logger("field_types")
+
+# Tipo de dato de Zoho (data_type del API de campos) -> tipo al que se convierte la columna
+ZOHO_TYPE_TO_KIND = {
+    'datetime': 'datetime',
+    'date': 'date',
+    'integer': 'integer',
+    'bigint': 'integer',
+    'double': 'float',
+    'currency': 'float',
+    'decimal': 'float',
+    'percent': 'float',
+    'boolean': 'boolean',
+    'picklist': 'category',
+}
+# Filas no nulas que se revisan para inferir el tipo de las columnas sin metadatos
+DEFAULT_SAMPLE_SIZE = 1000
+_BOOLEAN_VALUES = {'true': True, 'false': False}
+_INTEGER_PATTERN = r'^-?\d+$'
+_FLOAT_PATTERN = r'^-?\d+(\.\d+)?([eE][-+]?\d+)?$'
+_DATETIME_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}([+-]\d{2}:\d{2}|Z)?$'
+_DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}$'
+# Ids de Zoho y de lookups (19 dígitos) y otros códigos largos: se dejan como texto aunque sean numéricos
+_ID_LIKE_PATTERN = r'^-?\d{16,}$'
+_INT64_MIN, _INT64_MAX = -2**63, 2**63 - 1
+
+
+def _parse_integers(values: pd.Series) -> pd.Series:
+    # Conversión exacta desde el texto: pd.to_numeric pasa por float64 cuando la columna tiene nulos
+    # y pierde precisión por encima de 2^53. Zoho a veces exporta enteros como "10.0".
+    text = values.astype('string').str.strip().str.replace(r'\.0+$', '', regex=True)
+    valid = text.str.match(_INTEGER_PATTERN).fillna(False).to_numpy(dtype=bool)
+    data = np.zeros(len(text), dtype='int64')
+    mask = np.ones(len(text), dtype=bool)
+    for i, value in zip(np.flatnonzero(valid), text[valid]):
+        number = int(value)
+        # Fuera del rango de INT64 el valor no es un entero de BigQuery y queda nulo
+        if _INT64_MIN <= number <= _INT64_MAX:
+            data[i], mask[i] = number, False
+    return pd.Series(pd.arrays.IntegerArray(data, mask), index=values.index, name=values.name)
+
+
+def _convert(values: pd.Series, kind: str) -> pd.Series:
+    if kind == 'datetime':
+        return pd.to_datetime(values, utc=True, errors='coerce')
+    if kind == 'date':
+        dates = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+        # Un datetime64 sin zona se cargaría como DATETIME; date32 se carga como DATE
+        days = pa.Array.from_pandas(dates).cast(pa.date32())
+        return pd.Series(pd.arrays.ArrowExtensionArray(days), index=values.index, name=values.name)
+    if kind == 'integer':
+        return _parse_integers(values)
+    if kind == 'float':
+        return pd.to_numeric(values, errors='coerce').astype('Float64')
+    if kind == 'boolean':
+        return values.str.lower().map(_BOOLEAN_VALUES).astype('boolean')
+    if kind == 'category':
+        return values.astype('category')
+    return values
+
+
+def cast_column(values: pd.Series, kind: str, errors: str = 'coerce') -> pd.Series:
+    """
+    Convierte una columna de texto al tipo indicado, siempre al mismo tipo para que todos los lotes
+    de un módulo tengan el mismo esquema en BigQuery. Los valores que no son del tipo se convierten
+    en nulos y se registra cuántos (errors='coerce'), o se lanza ValueError (errors='raise').
+
+    Args:
+        values (pd.Series): columna leída como texto.
+        kind (str): 'datetime', 'date', 'integer', 'float', 'boolean' o 'category'.
+        errors (str): 'coerce' o 'raise'.
+    """
+    converted = _convert(values, kind)
+    invalid = int((converted.isna() & values.notna()).sum())
+    if invalid:
+        message = f"La columna '{values.name}' tiene {invalid} valores que no son {kind}"
+        if errors == 'raise':
+            raise ValueError(message)
+        logger.warning(f"AVISO: {message}. Se cargan como nulos.")
+    return converted
+
+
+def infer_kind(values: pd.Series, sample_size: int = DEFAULT_SAMPLE_SIZE) -> str:
+    """
+    Infiere el tipo de una columna de texto a partir de una muestra de sus valores no nulos.
+    Retorna None si la columna debe quedar como texto.
+    """
+    sample = values.dropna()
+    if sample.empty:
+        return None
+    sample = sample.head(sample_size).astype(str)
+    if sample.str.lower().isin(_BOOLEAN_VALUES.keys()).all():
+        return 'boolean'
+    if sample.str.match(_DATETIME_PATTERN).all():
+        return 'datetime'
+    if sample.str.match(_DATE_PATTERN).all():
+        return 'date'
+    # Los ids y códigos numéricos largos tampoco son cantidades
+    if sample.str.match(_ID_LIKE_PATTERN).any():
+        return None
+    # Los números con ceros a la izquierda (teléfonos, códigos) se dejan como texto
+    if sample.str.match(_INTEGER_PATTERN).all() and not sample.str.match(r'^-?0\d').any():
+        return 'integer'
+    if sample.str.match(_FLOAT_PATTERN).all() and not sample.str.match(r'^-?0\d').any():
+        return 'float'
+    return None
+
+
+class ModuleColumnKinds:
+    """
+    Tipo de cada columna de un módulo, decidido una sola vez: por los metadatos de Zoho o, para las
+    columnas sin metadatos, por inferencia sobre el primer lote en que aparecen. Los tipos decididos se
+    guardan junto al mapeo de columnas (schema/<modulo>.types.json) y se reutilizan en los lotes y
+    ejecuciones siguientes, de modo que una columna nunca cambia de tipo entre cargas.
+    """
+
+    def __init__(self, module_api_name: str = None, metadata_kinds: dict = None, schema_dir: str = None):
+        """
+        Args:
+            module_api_name (str): nombre del modulo de zoho; si es None los tipos no se persisten
+            metadata_kinds (dict): columna de BigQuery -> tipo según los metadatos de Zoho (ver kinds_from_zoho_fields)
+            schema_dir (str): carpeta donde se guardan los tipos del módulo; por defecto la del mapeo de columnas
+        """
+        self.module_api_name = module_api_name
+        self.metadata_kinds = metadata_kinds or {}
+        self.path = os.path.join(schema_dir or schema_mapping.DEFAULT_SCHEMA_DIR, f"{module_api_name}.types.json") if module_api_name else None
+        self.kinds = self._load() # columna de BigQuery -> tipo decidido ('string' para texto)
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)['kinds']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"AVISO: No se pudieron leer los tipos de columnas {self.path}. Causa: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'module': self.module_api_name, 'kinds': self.kinds}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"AVISO: No se pudieron guardar los tipos de columnas {self.path}. Causa: {e}")
+
+    def resolve(self, dataframe: pd.DataFrame, infer: bool = True, sample_size: int = DEFAULT_SAMPLE_SIZE) -> dict:
+        """Retorna columna -> tipo para las columnas del lote, decidiendo y guardando las que aparecen por primera vez."""
+        with self._lock:
+            new_kinds = {}
+            for column in dataframe.columns:
+                if column in self.kinds or column in ('Id', 'processed_at'):
+                    continue
+                kind = self.metadata_kinds.get(column)
+                if kind is None:
+                    # Una columna sin valores en su primer lote queda como texto: no hay datos para inferir otro tipo
+                    kind = (infer_kind(dataframe[column], sample_size) if infer else None) or 'string'
+                new_kinds[column] = kind
+            if new_kinds:
+                self.kinds.update(new_kinds)
+                self._save()
+                logger.info(f"Tipos decididos para {len(new_kinds)} columnas nuevas de {self.module_api_name}: {new_kinds}")
+            return {column: self.kinds[column] for column in dataframe.columns if column in self.kinds}
+
+
+def apply_field_types(dataframe: pd.DataFrame, column_kinds=None, infer: bool = True, sample_size: int = DEFAULT_SAMPLE_SIZE, errors: str = 'coerce') -> pd.DataFrame:
+    """
+    Convierte las columnas de texto del DataFrame a tipos compactos antes de la carga.
+    Los tipos se deciden una vez por columna (metadatos de Zoho o inferencia, ver ModuleColumnKinds) y
+    todos los lotes se convierten al mismo tipo. La columna Id se deja siempre como texto.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame ya transformado (columnas con nombres de BigQuery).
+        column_kinds (ModuleColumnKinds | dict): tipos del módulo; un dict (columna -> tipo, ver kinds_from_zoho_fields)
+            se usa como metadatos de un ModuleColumnKinds sin persistir.
+        infer (bool): inferir el tipo de las columnas que no tienen metadatos.
+        sample_size (int): filas no nulas que se revisan para inferir el tipo.
+        errors (str): 'coerce' convierte en nulos los valores que no son del tipo de su columna; 'raise' lanza ValueError.
+    """
+    if not isinstance(column_kinds, ModuleColumnKinds):
+        column_kinds = ModuleColumnKinds(metadata_kinds=column_kinds)
+    kinds = column_kinds.resolve(dataframe, infer, sample_size)
+    for column in dataframe.columns:
+        kind = kinds.get(column)
+        if kind in (None, 'string'):
+            continue
+        if not (pd.api.types.is_object_dtype(dataframe[column]) or pd.api.types.is_string_dtype(dataframe[column])):
+            continue
+        dataframe[column] = cast_column(dataframe[column], kind, errors)
+    return dataframe
+
+
+def kinds_from_zoho_fields(field_types: dict, schema_mapper) -> dict:
+    """
+    Traduce los metadatos de campos de Zoho (api_name -> data_type) a columna de BigQuery -> tipo.
+
+    Args:
+        field_types (dict): api_name -> data_type, como lo devuelve get_module_field_types.
+        schema_mapper (SchemaMapper): mapeo de columnas del módulo.
+    """
+    return {schema_mapper.clean_column(api_name): ZOHO_TYPE_TO_KIND.get(data_type, 'string') for api_name, data_type in field_types.items()}
@@ -0,0 +1,134 @@
+import json #persistir el mapeo de columnas por módulo
+import os #crear la carpeta de los mapeos
+import re #corregir nombres de columnas
+import threading #varios módulos/hilos pueden pedir el mismo mapeo
+from unidecode import unidecode #eliminar caracteres no ASCII (como ñ, ó)
+from SRC.helper.logger_config import setup_logger #informacion relevante a la consola
+
+logger = setup_logger("schema_mapping")
+
+# Carpeta donde se guarda el mapeo encabezado de Zoho -> columna de BigQuery de cada módulo
+DEFAULT_SCHEMA_DIR = os.path.join("/tmp", "zoho_etl_state", "schema")
+# Reglas de nombres de columna de BigQuery
+BIGQUERY_MAX_COLUMN_NAME_LENGTH = 300
+BIGQUERY_RESERVED_PREFIXES = ("_table_", "_file_", "_partition", "_row_timestamp", "__root__", "_colon_")
+# Columnas que agrega el propio ETL y que ningún encabezado de Zoho puede ocupar
+RESERVED_COLUMNS = ("processed_at",)
+
+
+def clean_name(header: str) -> str:
+    """
+    Convierte un encabezado de Zoho en un nombre de columna válido para BigQuery:
+    sin acentos, solo letras, números y guiones bajos, sin empezar por número ni por
+    un prefijo reservado, y de máximo 300 caracteres.
+    """
+    name = re.sub(r'[^0-9a-zA-Z_]', '_', unidecode(str(header)))
+    if not name:
+        name = "_"
+    if name[0].isdigit() or name.lower().startswith(BIGQUERY_RESERVED_PREFIXES):
+        name = f"c_{name}"
+    return name[:BIGQUERY_MAX_COLUMN_NAME_LENGTH]
+
+
+class SchemaMapper:
+    """
+    Mapeo estable de encabezados de Zoho a nombres de columna de BigQuery para un módulo.
+    El mapeo se calcula una sola vez por conjunto de encabezados, se reutiliza entre páginas
+    y ejecuciones, y garantiza nombres únicos (BigQuery no distingue mayúsculas). Un encabezado
+    conserva siempre el mismo nombre aunque aparezcan columnas nuevas.
+    """
+
+    def __init__(self, module_api_name: str = None, schema_dir: str = None):
+        """
+        Args:
+            module_api_name (str): nombre del modulo de zoho; si es None el mapeo no se persiste
+            schema_dir (str): carpeta donde se guarda el mapeo del módulo; por defecto DEFAULT_SCHEMA_DIR
+        """
+        self.module_api_name = module_api_name
+        self.path = os.path.join(schema_dir or DEFAULT_SCHEMA_DIR, f"{module_api_name}.json") if module_api_name else None
+        self.mapping = self._load() # encabezado de Zoho -> columna de BigQuery
+        self._headers_cache = {} # tupla de encabezados -> lista de columnas
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)['mapping']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"AVISO: No se pudo leer el mapeo de columnas {self.path}. Se recalculará. Causa: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'module': self.module_api_name, 'mapping': self.mapping}, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"AVISO: No se pudo guardar el mapeo de columnas {self.path}. Causa: {e}")
+
+    def _assign(self, header: str, used: set) -> str:
+        base = clean_name(header)
+        name = base
+        suffix = 2
+        while name.lower() in used:
+            tail = f"_{suffix}"
+            name = f"{base[:BIGQUERY_MAX_COLUMN_NAME_LENGTH - len(tail)]}{tail}"
+            suffix += 1
+        used.add(name.lower())
+        return name
+
+    def column_names(self, headers) -> list:
+        """
+        Retorna los nombres de columna de BigQuery para los encabezados indicados.
+        Los encabezados nuevos se agregan al mapeo persistido del módulo.
+        """
+        key = tuple(headers)
+        cached = self._headers_cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            if self.module_api_name is None:
+                # Sin módulo no hay mapeo acumulado: cada conjunto de encabezados se resuelve por separado
+                used = set(RESERVED_COLUMNS)
+                names = [self._assign(header, used) for header in key]
+            else:
+                new_headers = list(dict.fromkeys(header for header in key if header not in self.mapping))
+                if new_headers:
+                    if self.mapping:
+                        logger.info(f"INFO: {len(new_headers)} columnas nuevas en el mapeo de '{self.module_api_name}'.")
+                    used = {name.lower() for name in self.mapping.values()} | set(RESERVED_COLUMNS)
+                    for header in new_headers:
+                        self.mapping[header] = self._assign(header, used)
+                    self._save()
+                names = [self.mapping[header] for header in key]
+            self._headers_cache[key] = names
+        return names
+
+    def clean_column(self, header: str) -> str:
+        """Nombre de BigQuery de un encabezado de Zoho (por ejemplo Id o Modified_Time)."""
+        return self.mapping.get(header) or self.column_names([header])[0]
+
+    def original_name(self, column: str) -> str:
+        """Encabezado de Zoho correspondiente a una columna de BigQuery, o None si no está en el mapeo."""
+        for header, name in self.mapping.items():
+            if name.lower() == column.lower():
+                return header
+        return None
+
+
+_mappers = {}
+_mappers_lock = threading.Lock()
+
+def get_schema_mapper(module_api_name: str = None) -> SchemaMapper:
+    """Retorna el SchemaMapper del módulo, reutilizándolo entre páginas y ejecuciones del mismo proceso."""
+    with _mappers_lock:
+        if module_api_name not in _mappers:
+            _mappers[module_api_name] = SchemaMapper(module_api_name)
+        return _mappers[module_api_name]
@@ -1,28 +1,266 @@
 #importamos librerias necesarias
 import io #archivos en memoria
-import re #corregir nombres de columnas
+import csv #leer el encabezado del csv para el parser de pyarrow
 import zipfile #leer los archivos zip en memoria
 import pandas as pd #crear el dataframe con los datos y unificarlos
-from unidecode import unidecode #pasar nombres de columnas al formato de big query mas especificamente Eliminar caracteres no ASCII (como ñ, ó)
+import numpy as np #máscara de filas modificadas
+from SRC.Transform.schema_mapping import get_schema_mapper, RESERVED_COLUMNS #pasar nombres de columnas al formato de big query
 from SRC.helper.logger_config import setup_logger #informacion relevante a la consola
+from SRC.helper.metrics import PipelineMetrics, measure, timed_iter #tiempos de lectura por página
+from SRC.helper.row_hash_index import RowHashIndex #hashes de los registros ya cargados
 from datetime import datetime
 
 
 logger = setup_logger("transform")
 
-def clean_column_names(columns):
-    columns = [unidecode(col) for col in columns]
-    columns = [re.sub(r'[^0-9a-zA-Z_]', '_', col) for col in columns]
-    return columns
+def clean_column_names(columns, module_api_name: str = None):
+    """
+    Convierte los encabezados de Zoho en nombres de columna únicos y válidos para BigQuery.
+    Con module_api_name se usa el mapeo persistido del módulo, calculado una sola vez por
+    conjunto de encabezados y estable entre páginas y ejecuciones (ver schema_mapping.py).
+    """
+    return list(get_schema_mapper(module_api_name).column_names(list(columns)))
+
+# Motores disponibles para leer el CSV de cada ZIP:
+#   "pandas": lee el CSV completo con pd.read_csv (comportamiento original)
+#   "chunked": pd.read_csv por lotes de batch_size filas
+#   "pyarrow": lector en streaming de pyarrow por lotes de batch_size filas, con columnas de texto Arrow
+CSV_PARSERS = ("pandas", "chunked", "pyarrow")
+DEFAULT_BATCH_SIZE = 50000
+
+def _read_csv_header(z: zipfile.ZipFile, csv_filename: str) -> list:
+    """Lee solo la fila de encabezados del CSV dentro del ZIP."""
+    with z.open(csv_filename) as raw_file:
+        return next(csv.reader(io.TextIOWrapper(raw_file, encoding='utf-8-sig', newline='')), [])
+
+def _iter_pyarrow_batches(z: zipfile.ZipFile, csv_filename: str, batch_size: int):
+    """
+    Lee el CSV con el lector en streaming de pyarrow y genera DataFrames de hasta batch_size filas
+    con columnas string respaldadas por Arrow, sin crear un objeto Python por celda.
+    """
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError as e:
+        raise ImportError("El parser 'pyarrow' requiere la librería pyarrow (pip install pyarrow).") from e
+
+    # Todas las columnas como texto, igual que dtype=str en el parser de pandas
+    header = _read_csv_header(z, csv_filename)
+    convert_options = pa_csv.ConvertOptions(column_types={name: pa.string() for name in header}, strings_can_be_null=True)
+    # Los campos de texto largo de Zoho pueden traer saltos de línea dentro de las comillas
+    parse_options = pa_csv.ParseOptions(newlines_in_values=True)
+    types_mapper = {pa.string(): pd.StringDtype("pyarrow")}.get
+
+    with z.open(csv_filename) as csv_file:
+        reader = pa_csv.open_csv(csv_file, parse_options=parse_options, convert_options=convert_options)
+        pending = []
+        pending_rows = 0
+        yielded = False
+        for record_batch in reader:
+            pending.append(record_batch)
+            pending_rows += record_batch.num_rows
+            if pending_rows >= batch_size:
+                yield pa.Table.from_batches(pending).to_pandas(types_mapper=types_mapper)
+                yielded = True
+                pending = []
+                pending_rows = 0
+        # El último lote incompleto, o un DataFrame vacío con las columnas si el CSV no tenía filas
+        if pending or not yielded:
+            yield pa.Table.from_batches(pending, schema=reader.schema).to_pandas(types_mapper=types_mapper)
+
+def iter_zip_batches(zip_content: io.BytesIO, parser: str = "pandas", batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Descomprime un ZIP descargado de Zoho y genera su CSV como DataFrames crudos (sin limpiar).
+    Con parser="pandas" se genera un único DataFrame con todo el CSV.
+
+    Args:
+        zip_content (io.BytesIO): ZIP de una página descargada en memoria.
+        parser (str): motor de lectura del CSV, uno de CSV_PARSERS.
+        batch_size (int): filas máximas por lote para los parsers "chunked" y "pyarrow".
+    """
+    if parser not in CSV_PARSERS:
+        raise ValueError(f"Parser de CSV no soportado: '{parser}'. Opciones: {CSV_PARSERS}")
+
+    with zipfile.ZipFile(zip_content, 'r') as z:
+        # como zoho solo nos devuelve un archivo csv en cada zip lo asumimos
+        csv_filename = z.namelist()[0]
+        if parser == "pyarrow":
+            yield from _iter_pyarrow_batches(z, csv_filename, batch_size)
+            return
+        with z.open(csv_filename) as csv_file:
+            if parser == "chunked":
+                yield from pd.read_csv(csv_file, dtype=str, chunksize=batch_size)
+            else:
+                # Cargar CSV en DataFrame
+                yield pd.read_csv(csv_file, low_memory=False, dtype= str)
+
+def _finish_batch(df: pd.DataFrame, processed_at: pd.Timestamp, module_api_name: str = None) -> pd.DataFrame:
+    # Limpiar nombres de columna
+    df.columns = clean_column_names(df.columns, module_api_name)
+    df["processed_at"] = processed_at if processed_at is not None else pd.Timestamp.utcnow()
+    return df
+
+def transform_zip_page(zip_content: io.BytesIO, processed_at: pd.Timestamp = None, parser: str = "pandas", batch_size: int = DEFAULT_BATCH_SIZE, module_api_name: str = None) -> pd.DataFrame:
+    """
+    Descomprime un único ZIP descargado de Zoho, carga su CSV en un DataFrame
+    y limpia los nombres de las columnas.
+
+    Args:
+        zip_content (io.BytesIO): ZIP de una página descargada en memoria.
+        processed_at (pd.Timestamp): marca de tiempo de procesamiento; si no se indica se usa la hora actual.
+        parser (str): motor de lectura del CSV, uno de CSV_PARSERS.
+        batch_size (int): filas máximas por lote para los parsers "chunked" y "pyarrow".
+        module_api_name (str): módulo de Zoho cuyo mapeo de columnas se usa.
+    """
+    batches = list(iter_zip_batches(zip_content, parser, batch_size))
+    if not batches:
+        df = pd.DataFrame()
+    else:
+        df = batches[0] if len(batches) == 1 else pd.concat(batches, ignore_index=True)
+    return _finish_batch(df, processed_at, module_api_name)
+
+class IncompleteTransformError(Exception):
+    """Alguna página del módulo no se pudo transformar; los datos transformados están incompletos."""
+
+
+def iter_transformed_pages(zip_pages, parser: str = "pandas", batch_size: int = DEFAULT_BATCH_SIZE, module_api_name: str = None, metrics: PipelineMetrics = None, allow_partial: bool = True):
+    """
+    Transforma las páginas a medida que llegan, sin retener los ZIPs ya procesados.
+    Genera (pagina, DataFrame) por cada lote de cada página (un único lote por página con parser="pandas");
+    las páginas que no se pueden procesar se registran y se omiten, o con allow_partial=False se lanza
+    IncompleteTransformError para que la ejecución falle sin registrar la marca de agua.
+
+    Args:
+        zip_pages: iterable de (pagina, io.BytesIO), como el que genera iter_zoho_pages.
+        parser (str): motor de lectura del CSV, uno de CSV_PARSERS.
+        batch_size (int): filas máximas por lote para los parsers "chunked" y "pyarrow".
+        module_api_name (str): módulo de Zoho cuyo mapeo de columnas se usa.
+        metrics (PipelineMetrics): si se indica, registra por página el tiempo de descompresión y lectura y las filas.
+        allow_partial (bool): si es False, una página que no se puede procesar detiene la transformación.
+    """
+    processed_at = pd.Timestamp.utcnow()
+    for page, zip_content in zip_pages:
+        try:
+            for i, df in enumerate(timed_iter(iter_zip_batches(zip_content, parser, batch_size), metrics, 'parse', page)):
+                df = _finish_batch(df, processed_at, module_api_name)
+                if metrics is not None:
+                    metrics.record_page(page, rows=len(df))
+                logger.info(f"INFO: Página {page}, lote {i+1} transformado ({len(df)} filas).")
+                yield page, df
+        except Exception as e:
+            logger.exception(f"ERROR: No se pudo procesar el ZIP de la página {page} en memoria. Causa: {e}")
+            if not allow_partial:
+                raise IncompleteTransformError(f"No se pudo transformar la página {page}.") from e
+        finally:
+            zip_content.close() # liberar el ZIP antes de pedir la siguiente página
+
+def deduplicate_records(dataframe: pd.DataFrame, key_column: str = "Id", order_column: str = "Modified_Time") -> pd.DataFrame:
+    """
+    Elimina los registros repetidos dentro del lote, conservando por cada key_column
+    la fila con el order_column más reciente.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame ya transformado.
+        key_column (str): nombre de la columna llave en Zoho; se busca su nombre limpio.
+        order_column (str): nombre de la columna de fecha en Zoho; se busca su nombre limpio.
+    """
+    key, order = clean_column_names([key_column, order_column])
+    if dataframe.empty or key not in dataframe.columns:
+        return dataframe
+
+    if order in dataframe.columns:
+        # Orden estable por fecha para que keep='last' se quede con la versión más reciente
+        order_values = pd.to_datetime(dataframe[order], utc=True, errors='coerce').reset_index(drop=True)
+        dataframe = dataframe.iloc[order_values.sort_values(kind='stable', na_position='first').index]
+    deduplicated = dataframe.drop_duplicates(subset=[key], keep='last').reset_index(drop=True)
+
+    removed = len(dataframe) - len(deduplicated)
+    if removed:
+        logger.info(f"INFO: Se eliminaron {removed} registros duplicados por '{key}' dentro del lote.")
+    return deduplicated
+
+# Columnas de auditoría de Zoho que no cuentan para el hash de contenido: cambian cuando una
+# automatización toca el registro aunque no modifique ningún campo
+HASH_EXCLUDED_COLUMNS = ("Modified_Time", "Modified_By")
+
+def row_hashes(dataframe: pd.DataFrame, exclude=HASH_EXCLUDED_COLUMNS) -> pd.Series:
+    """
+    Hash estable (uint64) del contenido de cada fila, calculado sobre las columnas ordenadas por nombre
+    para que no dependa del orden de las columnas del CSV. Se excluyen las columnas de exclude y siempre
+    processed_at, que cambia en cada ejecución.
+    El hash depende de los tipos de las columnas: se calcula antes de convertir a tipos compactos.
+    """
+    columns = sorted(column for column in dataframe.columns if column not in exclude and column not in RESERVED_COLUMNS)
+    return pd.util.hash_pandas_object(dataframe[columns], index=False)
+
+def drop_unchanged_rows(dataframe: pd.DataFrame, key_column: str, hash_index: RowHashIndex, module_api_name: str, exclude=HASH_EXCLUDED_COLUMNS) -> tuple:
+    """
+    Descarta las filas cuyo hash de contenido coincide con el registrado en el índice para su Id,
+    es decir, registros que Zoho devolvió sin cambios desde la última carga.
+    Retorna (DataFrame con las filas nuevas o modificadas, lista de (Id, hash) de esas filas), para
+    registrar los hashes en el índice solo después de que la carga termine con éxito.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame ya transformado.
+        key_column (str): nombre de la columna llave en Zoho; se busca su nombre limpio.
+        hash_index (RowHashIndex): índice Id -> hash de las cargas anteriores.
+        module_api_name (str): módulo del índice.
+        exclude: nombres de Zoho de las columnas que no cuentan para el hash; se buscan sus nombres limpios.
+    """
+    key = clean_column_names([key_column])[0]
+    excluded = {clean_column_names([column])[0] for column in exclude}
+    if dataframe.empty or key not in dataframe.columns:
+        return dataframe, []
+
+    ids = dataframe[key].astype(str)
+    # Enteros con signo, el tipo entero de SQLite
+    hashes = pd.Series(row_hashes(dataframe, excluded).to_numpy().view('int64'), index=dataframe.index)
+    stored = hash_index.get_hashes(module_api_name, ids.unique().tolist())
+    # Comparación en Python: con map los ids ausentes darían NaN y los hashes pasarían a float
+    changed = np.fromiter((stored.get(row_id) != row_hash for row_id, row_hash in zip(ids, hashes)), dtype=bool, count=len(ids))
+
+    unchanged = len(dataframe) - int(changed.sum())
+    if unchanged:
+        logger.info(f"INFO: Se descartaron {unchanged} registros sin cambios desde la última carga.")
+        dataframe = dataframe[changed].reset_index(drop=True)
+    return dataframe, list(zip(ids[changed].tolist(), hashes[changed].tolist()))
+
+def max_watermark(dataframe: pd.DataFrame, column_name: str, current: str = None) -> str:
+    """
+    Calcula la marca de agua (máxima fecha ISO 8601 en UTC) de la columna indicada,
+    combinándola con la marca de agua actual si se indica.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame ya transformado.
+        column_name (str): nombre de la columna de fecha en Zoho (ej. Modified_Time); se busca su nombre limpio.
+        current (str): marca de agua acumulada hasta ahora, o None.
+    """
+    column = clean_column_names([column_name])[0]
+    candidates = [pd.Timestamp(current)] if current else []
+    if column in dataframe.columns and not dataframe.empty:
+        column_max = pd.to_datetime(dataframe[column], utc=True, errors='coerce').max()
+        if not pd.isna(column_max):
+            candidates.append(column_max)
+    if not candidates:
+        return None
+    return max(candidates).tz_convert('UTC').isoformat(timespec='seconds')
+
 # --- 2. Función de Transformación ---
-def transform_data_in_memory(list_of_zip_bytes: list[io.BytesIO]) -> pd.DataFrame:
+def transform_data_in_memory(list_of_zip_bytes: list[io.BytesIO], parser: str = "pandas", batch_size: int = DEFAULT_BATCH_SIZE, module_api_name: str = None, metrics: PipelineMetrics = None, allow_partial: bool = True, page_keys: list = None) -> pd.DataFrame:
     """
     Toma una lista de ZIPs en memoria, los descomprime, los carga en DataFrames de Pandas,
     aplica las transformaciones y consolidación, y devuelve un único DataFrame final.
 
     Args:
         list_of_zip_bytes (list[io.BytesIO]): Lista donde estan almacenados los zip descargados en memoria.
-        
+        parser (str): motor de lectura del CSV, uno de CSV_PARSERS.
+        batch_size (int): filas máximas por lote para los parsers "chunked" y "pyarrow".
+        module_api_name (str): módulo de Zoho cuyo mapeo de columnas se usa.
+        metrics (PipelineMetrics): si se indica, registra por página el tiempo de descompresión y lectura y las filas.
+        allow_partial (bool): si es True se omiten los ZIPs que no se pueden procesar; si es False se lanza
+            IncompleteTransformError.
+        page_keys (list): página de cada ZIP (número o clave de rango del backfill) con la que se registran
+            las métricas, la misma de la extracción; por defecto 1, 2, ...
     """
     logger.info("\n--- INICIANDO PROCESO DE TRANSFORMACIÓN EN MEMORIA ---")
     all_dataframes = [] #donde se van a guardar los dataframes
@@ -31,26 +269,24 @@ def transform_data_in_memory(list_of_zip_bytes: list[io.BytesIO]) -> pd.DataFram
         logger.warning("AVISO: No hay ZIPs para transformar. Devolviendo DataFrame vacío.")
         return pd.DataFrame()
 
-    for i, zip_content in enumerate(list_of_zip_bytes):
+    processed_at = pd.Timestamp.utcnow()
+    page_keys = page_keys or range(1, len(list_of_zip_bytes) + 1)
+    for i, (page, zip_content) in enumerate(zip(page_keys, list_of_zip_bytes)):
         try:
-            with zipfile.ZipFile(zip_content, 'r') as z:
-                # como zoho solo nos devuelve un archivo csv en cada zip lo asumimos
-                csv_filename = z.namelist()[0]
-                with z.open(csv_filename) as csv_file:
-                    # Cargar CSV en DataFrame
-                    df = pd.read_csv(csv_file, low_memory=False, dtype= str)
-                    # Limpiar nombres de columna
-                    df.columns = clean_column_names(df.columns) 
-                    all_dataframes.append(df)
-                    logger.info(f"INFO: ZIP {i+1}/{len(list_of_zip_bytes)} procesado.")
+            with measure(metrics, 'parse', page):
+                all_dataframes.append(transform_zip_page(zip_content, processed_at, parser, batch_size, module_api_name))
+            if metrics is not None:
+                metrics.record_page(page, rows=len(all_dataframes[-1]))
+            logger.info(f"INFO: ZIP {i+1}/{len(list_of_zip_bytes)} (página {page}) procesado.")
         except Exception as e:
-            logger.exception(f"ERROR: No se pudo procesar el ZIP {i+1} en memoria. Causa: {e}")
+            logger.exception(f"ERROR: No se pudo procesar el ZIP de la página {page} en memoria. Causa: {e}")
+            if not allow_partial:
+                raise IncompleteTransformError(f"No se pudo transformar la página {page}.") from e
             
     if not all_dataframes:
         logger.error("AVISO: Después de la transformación, no hay DataFrames válidos para concatenar.")
         return pd.DataFrame() # Devuelve un DataFrame vacío si no se pudo procesar nada
 
     final_df = pd.concat(all_dataframes, ignore_index=True)
-    final_df["processed_at"] = pd.Timestamp.utcnow()
     logger.info(f"Transformación completa. Total de filas consolidadas: {len(final_df)}")
-    return final_df
\ No newline at end of file
+    return final_df
@@ -0,0 +1,118 @@
+import json #los eventos se registran como json
+import sys #unidades de ru_maxrss según el sistema operativo
+import threading #las cargas en paralelo registran métricas desde varios hilos
+import time #medir la duración de cada etapa
+from contextlib import contextmanager, nullcontext
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+try:
+    import resource #memoria máxima del proceso (no existe en Windows)
+except ImportError:
+    resource = None
+
+logger = setup_logger("metrics")
+
+
+def peak_rss_mb() -> float:
+    """Memoria residente máxima del proceso en MB, o None si el sistema no la reporta."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class PipelineMetrics:
+    """
+    Métricas de una ejecución del ETL de un módulo: duración acumulada por etapa (espera en la cola
+    de Zoho, descarga, lectura del CSV, carga), y por página los bytes descargados, las filas, el número
+    de consultas de estado y los tiempos de cada etapa. Cada evento se registra como una línea json en
+    el logger "metrics" y summary() devuelve el resumen de la ejecución.
+    """
+
+    def __init__(self, module_api_name: str):
+        """
+        Args:
+            module_api_name (str): nombre del modulo de zoho
+        """
+        self.module_api_name = module_api_name
+        self.stages = {} # etapa -> segundos acumulados
+        self.pages = {} # pagina -> métricas de la página
+        self.counters = {} # contador -> valor acumulado
+        self._start_time = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def log_event(self, event: str, **fields):
+        """Registra un evento como una línea json con el módulo y la memoria máxima del proceso."""
+        logger.info(json.dumps({'event': event, 'module': self.module_api_name, **fields, 'peak_rss_mb': peak_rss_mb()}, default=str))
+
+    def add_stage_time(self, name: str, seconds: float, page=None):
+        """Suma segundos a una etapa y, si se indica, a la página."""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0) + seconds
+        if page is not None:
+            self.record_page(page, **{f"{name}_seconds": seconds})
+
+    def record_page(self, page, **values):
+        """Acumula valores numéricos en las métricas de la página (bytes, rows, polls, ..._seconds)."""
+        with self._lock:
+            entry = self.pages.setdefault(page, {})
+            for key, value in values.items():
+                entry[key] = entry.get(key, 0) + value
+
+    def increment(self, name: str, value: float = 1):
+        """Acumula un contador de la ejecución (por ejemplo filas cargadas)."""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name: str, page=None):
+        """Mide la duración del bloque y la suma a la etapa `name` (y a la página, si se indica)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start, page)
+
+    def summary(self) -> dict:
+        """Resumen de la ejecución: duración total, segundos por etapa, contadores, páginas y memoria máxima."""
+        with self._lock:
+            # Las páginas son números o claves de rango del backfill; se ordenan sin comparar un tipo con otro
+            pages = {page: {key: round(value, 3) for key, value in entry.items()} for page, entry in sorted(self.pages.items(), key=lambda item: (isinstance(item[0], str), item[0]))}
+            total_bytes = sum(entry.get('bytes', 0) for entry in self.pages.values())
+            download_seconds = self.stages.get('download', 0)
+            return {
+                'module': self.module_api_name,
+                'seconds': round(time.perf_counter() - self._start_time, 2),
+                'stages': {name: round(seconds, 2) for name, seconds in self.stages.items()},
+                'counters': dict(self.counters),
+                'download_bytes': total_bytes,
+                'download_mb_per_second': round(total_bytes / download_seconds / 1e6, 2) if download_seconds else None,
+                'pages': pages,
+                'peak_rss_mb': peak_rss_mb(),
+            }
+
+
+def measure(metrics: PipelineMetrics, name: str, page=None):
+    """metrics.stage(name, page) si hay métricas; si metrics es None no mide nada."""
+    return metrics.stage(name, page) if metrics is not None else nullcontext()
+
+
+def timed_iter(iterable, metrics: PipelineMetrics, name: str, page=None):
+    """
+    Recorre un iterable sumando a la etapa `name` el tiempo que tarda en producir cada elemento
+    (por ejemplo, descomprimir y leer cada lote de un CSV). Si metrics es None lo recorre sin medir.
+    """
+    if metrics is None:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            metrics.add_stage_time(name, time.perf_counter() - start, page)
+            return
+        metrics.add_stage_time(name, time.perf_counter() - start, page)
+        yield item
@@ -0,0 +1,167 @@
+import random #jitter en las esperas entre reintentos
+import threading #el limitador se comparte entre hilos/módulos
+import time #esperas y presupuesto de reintentos
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("retry")
+
+# Códigos HTTP que indican un error temporal del servidor o un límite de peticiones
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+# Nombres de excepciones de red (requests/urllib3) que se consideran temporales
+RETRYABLE_EXCEPTION_NAMES = ('ConnectionError', 'Timeout', 'ConnectTimeout', 'ReadTimeout', 'ChunkedEncodingError', 'ProtocolError', 'RemoteDisconnected', 'IncompleteRead')
+
+
+class RetryableError(Exception):
+    """Error temporal (límite de peticiones, error 5xx, red) que vale la pena reintentar."""
+
+    def __init__(self, message: str, retry_after: float = None):
+        """
+        Args:
+            message (str): descripción del error
+            retry_after (float): segundos que el servidor pidió esperar antes de reintentar, si los indicó
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Indica si una excepción es temporal: RetryableError, errores de red o timeouts,
+    incluso si vienen envueltos en otra excepción (por ejemplo SDKException del SDK de Zoho).
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, (RetryableError, ConnectionError, TimeoutError)):
+            return True
+        if type(error).__name__ in RETRYABLE_EXCEPTION_NAMES:
+            return True
+        error = getattr(error, 'cause', None) or error.__cause__ or error.__context__
+    return False
+
+
+def retry_after_from_headers(headers: dict) -> float:
+    """
+    Segundos a esperar según las cabeceras de límite de peticiones (Retry-After o X-RATELIMIT-RESET),
+    o None si no hay ninguna. X-RATELIMIT-RESET puede venir en segundos o como fecha epoch (s o ms).
+    """
+    if not headers:
+        return None
+    headers = {str(key).lower(): value for key, value in headers.items()}
+    for name in ('retry-after', 'x-ratelimit-reset'):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            continue
+        if seconds > 1e12: # epoch en milisegundos
+            seconds = seconds / 1000 - time.time()
+        elif seconds > 1e9: # epoch en segundos
+            seconds = seconds - time.time()
+        return max(0.0, seconds)
+    return None
+
+
+class TokenBucket:
+    """
+    Limitador de peticiones del lado del cliente (token bucket). Cada llamada al API consume
+    un token; los tokens se recargan a `rate` por segundo hasta `capacity`. Cuando el servidor
+    responde con un límite de peticiones, pause() detiene a todos los hilos que comparten el limitador.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate (float): tokens que se recargan por segundo (peticiones por segundo sostenidas)
+            capacity (float): tokens máximos acumulados (ráfaga permitida)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """Espera hasta que haya tokens disponibles y los consume."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if now >= self._paused_until and self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = max(self._paused_until - now, (tokens - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Detiene las peticiones de todos los hilos durante `seconds` y vacía los tokens acumulados."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class RetryPolicy:
+    """Política de reintentos con backoff exponencial, jitter y un presupuesto total de tiempo."""
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1, max_delay: float = 60, max_total_seconds: float = 300, jitter: float = 0.2):
+        """
+        Args:
+            max_attempts (int): intentos máximos, incluyendo el primero
+            base_delay (float): segundos de la primera espera
+            max_delay (float): tope de segundos de cada espera
+            max_total_seconds (float): tiempo total máximo que se puede gastar en esperas
+            jitter (float): variación aleatoria relativa aplicada a cada espera
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_total_seconds = max_total_seconds
+        self.jitter = jitter
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Segundos a esperar después del intento `attempt` (1, 2, ...); respeta el retry_after del servidor."""
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        backoff *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return max(backoff, retry_after or 0)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+def call_with_retry(func, *args, policy: RetryPolicy = DEFAULT_RETRY_POLICY, rate_limiter: TokenBucket = None, description: str = "", **kwargs):
+    """
+    Ejecuta func(*args, **kwargs) reintentando los errores temporales (ver is_retryable) con la política indicada.
+    Los errores fatales y el último error temporal se relanzan al llamador.
+
+    Args:
+        func (callable): función a ejecutar; debe lanzar RetryableError para las respuestas temporales
+        policy (RetryPolicy): intentos, esperas y presupuesto total
+        rate_limiter (TokenBucket): limitador que se consulta antes de cada intento
+        description (str): descripción de la operación para los mensajes
+    """
+    waited = 0.0
+    attempt = 1
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= policy.max_attempts:
+                raise
+            retry_after = getattr(e, 'retry_after', None)
+            delay = policy.delay(attempt, retry_after)
+            if waited + delay > policy.max_total_seconds:
+                logger.error(f"ERROR: Se agotó el tiempo de reintentos para {description or func.__name__}.")
+                raise
+            if retry_after is not None and rate_limiter is not None:
+                # El servidor pidió esperar: se detienen también las peticiones de los demás hilos
+                rate_limiter.pause(retry_after)
+            logger.warning(f"AVISO: Error temporal en {description or func.__name__} (intento {attempt}/{policy.max_attempts}). Reintentando en {delay:.1f} s. Causa: {e}")
+            time.sleep(delay)
+            waited += delay
+            attempt += 1
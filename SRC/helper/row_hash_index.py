@@ -0,0 +1,85 @@
+import os #crear la carpeta del índice
+import sqlite3 #índice local Id -> hash
+import threading #evitar escrituras simultaneas del índice
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("row_hash_index")
+
+# Base de datos local con el hash de contenido de cada registro cargado, por módulo
+DEFAULT_INDEX_PATH = os.path.join("/tmp", "zoho_etl_state", "row_hashes.sqlite3")
+# Ids por consulta (SQLite admite 999 parámetros por sentencia en las versiones antiguas)
+LOOKUP_BATCH_SIZE = 900
+
+
+class RowHashIndex:
+    """
+    Índice local Id -> hash del contenido de cada registro cargado con éxito, por módulo.
+    Permite descartar antes de la carga las filas que Zoho devuelve sin cambios (ver
+    drop_unchanged_rows en SRC/Transform/transform.py). Los hashes se guardan como enteros
+    de 64 bits con signo, el tipo entero de SQLite.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        """
+        Args:
+            path (str): ruta del archivo SQLite del índice
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS row_hashes (module TEXT NOT NULL, id TEXT NOT NULL, hash INTEGER NOT NULL, "
+                    "PRIMARY KEY (module, id)) WITHOUT ROWID"
+                )
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Una conexión por operación: el índice se comparte entre los hilos de varios módulos
+        return sqlite3.connect(self.path, timeout=60)
+
+    def get_hashes(self, module_api_name: str, ids: list) -> dict:
+        """Retorna Id -> hash de los ids del módulo que ya están en el índice."""
+        stored = {}
+        connection = self._connect()
+        try:
+            for i in range(0, len(ids), LOOKUP_BATCH_SIZE):
+                batch = ids[i:i + LOOKUP_BATCH_SIZE]
+                placeholders = ", ".join("?" * len(batch))
+                rows = connection.execute(f"SELECT id, hash FROM row_hashes WHERE module = ? AND id IN ({placeholders})", [module_api_name, *batch])
+                stored.update(rows)
+        finally:
+            connection.close()
+        return stored
+
+    def update(self, module_api_name: str, id_hashes: list):
+        """
+        Registra (Id, hash) de las filas cargadas. Solo debe llamarse cuando la carga
+        de esas filas terminó con éxito.
+        """
+        if not id_hashes:
+            return
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO row_hashes (module, id, hash) VALUES (?, ?, ?)",
+                        ((module_api_name, row_id, row_hash) for row_id, row_hash in id_hashes)
+                    )
+            finally:
+                connection.close()
+        logger.info(f"Índice de hashes de '{module_api_name}' actualizado con {len(id_hashes)} registros.")
+
+    def clear(self, module_api_name: str):
+        """Borra los hashes del módulo, para forzar que la siguiente carga incluya todas las filas."""
+        with self._lock:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("DELETE FROM row_hashes WHERE module = ?", (module_api_name,))
+            finally:
+                connection.close()
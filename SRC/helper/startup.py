@@ -0,0 +1,62 @@
+import importlib #importar librerías pesadas solo cuando se necesitan
+import sys #saber si un módulo ya estaba importado
+import threading #importar en segundo plano mientras se espera a Zoho
+import time #medir importaciones e inicializaciones
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("startup")
+
+_timings = {} # nombre -> segundos de la primera vez en el proceso
+_timings_lock = threading.Lock()
+_invocations = 0
+
+
+def record_startup_time(name: str, seconds: float):
+    """
+    Registra cuánto tardó una importación o inicialización. Solo se guarda la primera vez en el
+    proceso: en una invocación en caliente (proceso reutilizado) ya no vuelve a ocurrir.
+    """
+    with _timings_lock:
+        _timings.setdefault(name, round(seconds, 3))
+
+
+def import_module(name: str):
+    """importlib.import_module registrando el tiempo de importación si el módulo no estaba importado."""
+    already_imported = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not already_imported:
+        record_startup_time(f"import:{name}", time.perf_counter() - start)
+    return module
+
+
+def preload_modules(names) -> threading.Thread:
+    """
+    Importa los módulos indicados en un hilo en segundo plano, por ejemplo las librerías de
+    transformación y carga mientras los trabajos de Zoho esperan en la cola. Si un módulo falla
+    no se hace nada: el error aparecerá cuando la etapa que lo necesita lo importe.
+    """
+    def preload():
+        for name in names:
+            try:
+                import_module(name)
+            except Exception as e:
+                logger.debug(f"No se pudo precargar {name}: {e}")
+
+    thread = threading.Thread(target=preload, name="preload_modules", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark_invocation() -> bool:
+    """Registra una ejecución del pipeline. Retorna True solo la primera vez en el proceso (arranque en frío)."""
+    global _invocations
+    with _timings_lock:
+        _invocations += 1
+        return _invocations == 1
+
+
+def startup_timings() -> dict:
+    """Segundos de cada importación e inicialización registrada en el proceso (import:<módulo>, zoho_sdk_init, ...)."""
+    with _timings_lock:
+        return dict(_timings)
@@ -0,0 +1,78 @@
+import json #el estado se guarda como json
+import os #crear la carpeta del estado
+import threading #evitar escrituras simultaneas del archivo
+from SRC.helper.logger_config import setup_logger #para mandar los mensajes por consola
+
+logger = setup_logger("state_store")
+
+# Archivo local donde se guardan las marcas de agua por módulo
+DEFAULT_STATE_PATH = os.path.join("/tmp", "zoho_etl_state", "watermarks.json")
+
+
+class StateStore:
+    """
+    Interfaz del almacén de estado del ETL. Guarda por módulo la marca de agua
+    (máximo Modified_Time cargado con éxito). Para guardar el estado en otro lugar
+    (por ejemplo GCS) basta con implementar read_state y write_state.
+    """
+
+    # Serializa las actualizaciones (leer, modificar y escribir) de los módulos que corren en paralelo en el proceso
+    _update_lock = threading.Lock()
+
+    def read_state(self) -> dict:
+        raise NotImplementedError
+
+    def write_state(self, state: dict):
+        raise NotImplementedError
+
+    def update_state(self, update):
+        """
+        Lee el estado, le aplica update(state) y lo escribe, sin que otro hilo escriba entre la lectura
+        y la escritura. Un almacén compartido entre procesos puede sobreescribirlo con su propio bloqueo.
+        """
+        with self._update_lock:
+            state = self.read_state()
+            update(state)
+            self.write_state(state)
+
+    def get_watermark(self, module_api_name: str) -> str:
+        """Retorna la marca de agua ISO 8601 del módulo, o None si nunca se ha cargado."""
+        return self.read_state().get(module_api_name, {}).get('watermark')
+
+    def set_watermark(self, module_api_name: str, watermark: str):
+        """
+        Registra la marca de agua del módulo. Solo debe llamarse cuando la carga de
+        todos los datos hasta esa fecha terminó con éxito.
+        """
+        def set_module_watermark(state: dict):
+            state.setdefault(module_api_name, {})['watermark'] = watermark
+        self.update_state(set_module_watermark)
+        logger.info(f"Marca de agua de '{module_api_name}' actualizada a {watermark}.")
+
+
+class JsonStateStore(StateStore):
+    """Almacén de estado en un archivo json local."""
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        """
+        Args:
+            path (str): ruta del archivo json del estado
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def read_state(self) -> dict:
+        with self._lock:
+            if not os.path.exists(self.path):
+                return {}
+            with open(self.path, 'r') as f:
+                return json.load(f)
+
+    def write_state(self, state: dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Escribir en un archivo temporal y reemplazar, para no dejar el estado a medio escribir
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.path)
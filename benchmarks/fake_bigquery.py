@@ -0,0 +1,108 @@
+import io #serializar los DataFrames del backend pandas_gbq
+import threading #las cargas en paralelo usan el mismo cliente
+import time #ancho de banda simulado
+from contextlib import contextmanager
+import SRC.Load.loader as loader
+
+
+class FakeJob:
+    """Trabajo de BigQuery ya terminado."""
+
+    def __init__(self, num_dml_affected_rows: int = None):
+        self.num_dml_affected_rows = num_dml_affected_rows
+
+    def result(self):
+        return self
+
+
+class FakeTable:
+    """Tabla con nombre y esquema, lo único que usa el loader."""
+
+    def __init__(self, table_id: str, schema: list):
+        self.table_id = table_id
+        self.schema = schema
+
+
+class FakeBigQueryClient:
+    """
+    Sustituto local del cliente de BigQuery para los backends "parquet" y "merge": lee por completo
+    el archivo de cada load job (y simula un ancho de banda opcional), y registra las consultas y los
+    esquemas de las tablas sin enviar nada.
+    """
+
+    def __init__(self, project: str = "benchmark-project", upload_mb_per_second: float = None):
+        """
+        Args:
+            project (str): proyecto con el que se califican las tablas
+            upload_mb_per_second (float): ancho de banda simulado de la subida; None para no limitarlo
+        """
+        self.project = project
+        self.upload_mb_per_second = upload_mb_per_second
+        self.tables = {} # tabla -> esquema
+        self.loaded_bytes = 0
+        self.load_jobs = 0
+        self.queries = 0
+        self._lock = threading.Lock()
+
+    def _upload(self, size: int):
+        with self._lock:
+            self.loaded_bytes += size
+            self.load_jobs += 1
+        if self.upload_mb_per_second:
+            time.sleep(size / (self.upload_mb_per_second * 1e6))
+
+    def load_table_from_file(self, file_obj, destination: str, job_config=None, rewind: bool = False):
+        if rewind:
+            file_obj.seek(0)
+        size = 0
+        for chunk in iter(lambda: file_obj.read(1024 * 1024), b''):
+            size += len(chunk)
+        self._upload(size)
+        with self._lock:
+            self.tables[destination] = list(getattr(job_config, 'schema', None) or [])
+        return FakeJob()
+
+    def query(self, sql: str):
+        with self._lock:
+            self.queries += 1
+        return FakeJob(num_dml_affected_rows=0)
+
+    def get_table(self, table_id: str) -> FakeTable:
+        with self._lock:
+            return FakeTable(table_id, list(self.tables.get(table_id, [])))
+
+    def update_table(self, table: FakeTable, fields: list):
+        with self._lock:
+            self.tables[table.table_id] = list(table.schema)
+        return table
+
+    def delete_table(self, table_id: str, not_found_ok: bool = False):
+        with self._lock:
+            self.tables.pop(table_id, None)
+
+
+@contextmanager
+def install_fake_bigquery(client: FakeBigQueryClient):
+    """
+    Reemplaza durante el bloque la salida a BigQuery del loader: get_bigquery_client devuelve el
+    cliente falso y el backend pandas_gbq serializa el DataFrame a Parquet (como el método de carga por
+    defecto de pandas-gbq) y lo "sube" al cliente falso, sin leer Credentials.json.
+    """
+    def fake_to_gbq(dataframe, destination_table=None, project_id=None):
+        buffer = io.BytesIO()
+        dataframe.to_parquet(buffer, index=False)
+        client._upload(buffer.tell())
+
+    replacements = {
+        'get_bigquery_client': lambda project_id=None: client,
+        'get_credentials': lambda *args, **kwargs: None,
+        '_to_gbq': fake_to_gbq,
+    }
+    originals = {name: getattr(loader, name) for name in replacements}
+    for name, replacement in replacements.items():
+        setattr(loader, name, replacement)
+    try:
+        yield client
+    finally:
+        for name, original in originals.items():
+            setattr(loader, name, original)
@@ -0,0 +1,137 @@
+import csv #filas de las páginas para los trabajos por rango
+import functools #fijar los parámetros del poller durante el benchmark
+import hashlib #checksum de las descargas a disco
+import io #descargas en memoria
+import itertools #ids de trabajos
+import os #descargas a disco
+import threading #el servidor falso se comparte entre módulos/hilos
+import time #latencia de la cola y del ancho de banda
+import zipfile #páginas de los trabajos por rango
+from contextlib import contextmanager
+from datetime import datetime
+import SRC.Extract.extractor as extractor
+import SRC.Extract.backfill as backfill
+from SRC.Extract.poller import JobPoller
+from benchmarks.synthetic_data import make_zip_page
+
+
+class FakeBulkRead:
+    """
+    Sustituto local de los endpoints de Bulk Read (crear trabajo, consultar estado y descargar).
+    Cada trabajo pasa a COMPLETED después de queue_latency segundos, y la descarga simula un ancho
+    de banda opcional. Las páginas posteriores a la última se completan con 0 registros, como en Zoho.
+    Los trabajos con created_range (backfill) filtran las filas de todas las páginas por Created_Time
+    y se paginan con el mismo número de filas por página que las páginas originales.
+    """
+
+    def __init__(self, pages: list, queue_latency: float = 1.0, download_mb_per_second: float = None, module_api_name: str = "BenchmarkModule"):
+        """
+        Args:
+            pages (list): ZIPs de cada página (bytes), por ejemplo de make_pages
+            queue_latency (float): segundos que tarda cada trabajo en completarse
+            download_mb_per_second (float): ancho de banda simulado de la descarga; None para no limitarlo
+            module_api_name (str): módulo con el que se generó la página vacía de las páginas sobrantes
+        """
+        self.pages = pages
+        self.queue_latency = queue_latency
+        self.download_mb_per_second = download_mb_per_second
+        self.module_api_name = module_api_name
+        self.empty_page = make_zip_page(module_api_name, rows=0, columns=0)
+        self._header = None
+        self._rows = None # filas de todas las páginas, para los trabajos por rango
+        self.jobs = {} # job_id -> {'page', 'ready_at'}
+        self.calls = {'create': 0, 'status': 0, 'download': 0}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def create_bulk_read_job(self, module_api_name: str, page: int, full_data: bool, created_column_date: str, updated_column_date: str, period: int, since: str = None, created_range: tuple = None, fields: list = None):
+        with self._lock:
+            self.calls['create'] += 1
+            job_id = f"fake-job-{next(self._ids)}"
+            self.jobs[job_id] = {'page': page, 'ready_at': time.monotonic() + self.queue_latency}
+            if created_range is not None:
+                rows, page_size = self._rows_in_range(created_range)
+                self.jobs[job_id].update(range_rows=rows[(page - 1) * page_size:page * page_size], range_more=page * page_size < len(rows))
+        return job_id
+
+    def _rows_in_range(self, created_range: tuple) -> tuple:
+        # Filas con Created_Time en [inicio, fin), como el criterio del backfill, y filas por página
+        if self._rows is None:
+            self._rows = []
+            for content in self.pages:
+                with zipfile.ZipFile(io.BytesIO(content)) as z:
+                    reader = csv.reader(io.TextIOWrapper(z.open(z.namelist()[0]), encoding='utf-8', newline=''))
+                    self._header = next(reader)
+                    self._rows.extend(reader)
+        created = self._header.index("Created_Time")
+        start, end = (datetime.fromisoformat(value) for value in created_range)
+        page_size = max(1, len(self._rows) // max(1, len(self.pages)))
+        return [row for row in self._rows if start <= datetime.fromisoformat(row[created]) < end], page_size
+
+    def _zip_rows(self, rows: list) -> bytes:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(self._header)
+        writer.writerows(rows)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+            z.writestr(f"{self.module_api_name}.csv", output.getvalue().encode("utf-8"))
+        return buffer.getvalue()
+
+    def get_job_status(self, job_id: str) -> dict:
+        with self._lock:
+            self.calls['status'] += 1
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if time.monotonic() < job['ready_at']:
+            return {'state': 'IN PROGRESS', 'more_records': None, 'count': None}
+        if 'range_rows' in job:
+            return {'state': 'COMPLETED', 'more_records': job['range_more'], 'count': len(job['range_rows'])}
+        has_data = job['page'] <= len(self.pages)
+        return {'state': 'COMPLETED', 'more_records': job['page'] < len(self.pages), 'count': None if has_data else 0}
+
+    def _content(self, job_id: str) -> bytes:
+        with self._lock:
+            self.calls['download'] += 1
+            job = self.jobs[job_id]
+        if 'range_rows' in job:
+            content = self._zip_rows(job['range_rows'])
+        else:
+            content = self.pages[job['page'] - 1] if job['page'] <= len(self.pages) else self.empty_page
+        if self.download_mb_per_second:
+            time.sleep(len(content) / (self.download_mb_per_second * 1e6))
+        return content
+
+    def download_job_result_in_memory(self, job_id: str) -> io.BytesIO:
+        return io.BytesIO(self._content(job_id))
+
+    def download_job_result_to_file(self, job_id: str, path: str) -> str:
+        content = self._content(job_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return hashlib.sha256(content).hexdigest()
+
+    @contextmanager
+    def install(self, history_path: str, poll_interval: float = 0.05):
+        """
+        Reemplaza durante el bloque las llamadas a Zoho del extractor y del backfill (que las importa por
+        nombre) por este servidor falso. El SDK no se inicializa y el poller usa un historial propio y un intervalo corto.
+        """
+        replacements = {
+            'initialize_zoho_sdk': lambda *args, **kwargs: None,
+            'create_bulk_read_job': self.create_bulk_read_job,
+            'get_job_status': self.get_job_status,
+            'download_job_result_in_memory': self.download_job_result_in_memory,
+            'download_job_result_to_file': self.download_job_result_to_file,
+            'JobPoller': functools.partial(JobPoller, min_interval=poll_interval, history_path=history_path),
+        }
+        originals = [(module, name, getattr(module, name)) for module in (extractor, backfill) for name in replacements if hasattr(module, name)]
+        for module, name, _ in originals:
+            setattr(module, name, replacements[name])
+        try:
+            yield self
+        finally:
+            for module, name, original in originals:
+                setattr(module, name, original)
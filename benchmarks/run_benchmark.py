@@ -0,0 +1,165 @@
+"""
+Benchmark del ETL sin credenciales ni red: genera páginas sintéticas de Zoho, las sirve con un
+Bulk Read falso y carga a un BigQuery falso. Mide la duración, el rendimiento y la memoria de
+la extracción, la transformación (por parser), la carga (por backend) y el pipeline completo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.run_benchmark --pages 5 --rows 20000 --columns 30 --queue-latency 0.5
+"""
+import argparse #parámetros del benchmark
+import io #páginas en memoria
+import json #reporte en json
+import os #carpeta temporal del benchmark
+import shutil #borrar el estado aislado al terminar
+import tempfile #estado aislado del benchmark
+import time #medir cada etapa
+import tracemalloc #memoria máxima asignada por etapa
+from contextlib import contextmanager
+from benchmarks.synthetic_data import make_pages
+from benchmarks.fake_zoho import FakeBulkRead
+from benchmarks.fake_bigquery import FakeBigQueryClient, install_fake_bigquery
+import SRC.Extract.extractor as extractor
+import SRC.Extract.checkpoint as checkpoint
+import SRC.Transform.schema_mapping as schema_mapping
+from SRC.Extract.extractor import extract_data_from_zoho, collect_pages
+from SRC.Extract.backfill import iter_backfill_pages
+from SRC.Transform.transform import transform_data_in_memory, CSV_PARSERS
+from SRC.Load.loader import load_data_to_bigquery, LOAD_BACKENDS
+from SRC.helper.metrics import peak_rss_mb
+from main import run_etl_pipeline
+
+MODULE = "BenchmarkModule"
+PROJECT_ID = "benchmark-project"
+DESTINATION_TABLE = "benchmark.zohocrm_primary__benchmarkmodule"
+# Rango del backfill: los Created_Time sintéticos van del 2024-01-01 a unos 350 días después
+BACKFILL_START, BACKFILL_END = "2024-01-01", "2025-01-01"
+
+
+def measure_stage(name: str, func, *args, **kwargs) -> tuple:
+    """Ejecuta func y retorna (resultado, resultados de la medición: segundos, memoria máxima asignada y RSS máximo)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, {'stage': name, 'seconds': round(seconds, 3), 'peak_alloc_mb': round(peak / 1e6, 1), 'peak_rss_mb': peak_rss_mb()}
+
+
+@contextmanager
+def isolated_state(state_dir: str):
+    """
+    Durante el bloque, el mapeo de columnas, los tipos de columna, los checkpoints y los metadatos de campos
+    se guardan en state_dir en lugar de /tmp/zoho_etl_state; al salir se restauran las rutas y se borra state_dir.
+    """
+    replacements = [
+        (schema_mapping, 'DEFAULT_SCHEMA_DIR', os.path.join(state_dir, "schema")),
+        (checkpoint, 'DEFAULT_CHECKPOINT_DIR', os.path.join(state_dir, "checkpoints")),
+        (extractor, 'DEFAULT_FIELDS_DIR', os.path.join(state_dir, "fields")),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in replacements]
+    for module, name, path in replacements:
+        setattr(module, name, path)
+    # Los mapeos ya cargados en el proceso apuntan a la carpeta anterior
+    with schema_mapping._mappers_lock:
+        schema_mapping._mappers.clear()
+    try:
+        yield state_dir
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+        with schema_mapping._mappers_lock:
+            schema_mapping._mappers.clear()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def run(args) -> list:
+    results = []
+    pages, generation = measure_stage("generate", make_pages, MODULE, args.pages, args.rows, args.columns, args.null_rate, args.seed)
+    total_bytes = sum(len(page) for page in pages)
+    generation.update(bytes=total_bytes)
+    results.append(generation)
+
+    state_dir = tempfile.mkdtemp(prefix="zoho_etl_benchmark_")
+    # Todo el estado del pipeline (historial del poller, mapeos, tipos, checkpoints) queda en state_dir, que se borra al final
+    with isolated_state(state_dir):
+        history_path = os.path.join(state_dir, "job_history.json")
+        fake_zoho = FakeBulkRead(pages, queue_latency=args.queue_latency, download_mb_per_second=args.download_mb_per_second, module_api_name=MODULE)
+
+        # 1. Extracción contra el Bulk Read falso
+        with fake_zoho.install(history_path):
+            zips, extraction = measure_stage("extract", extract_data_from_zoho, MODULE, "", "", "", "", True, "Created_Time", "Modified_Time", 1, max_concurrent_jobs=args.max_concurrent_jobs)
+        extraction.update(pages=len(zips), bytes=total_bytes, mb_per_second=round(total_bytes / extraction['seconds'] / 1e6, 2) if extraction['seconds'] else None, zoho_calls=dict(fake_zoho.calls))
+        results.append(extraction)
+
+        # 1b. Backfill por rangos de Created_Time contra el mismo Bulk Read falso
+        calls_before = dict(fake_zoho.calls)
+        with fake_zoho.install(history_path):
+            backfill_pages = iter_backfill_pages(MODULE, "", "", "", "", BACKFILL_START, BACKFILL_END, initial_slices=args.pages, max_concurrent_jobs=args.max_concurrent_jobs)
+            zips, backfill = measure_stage("extract[backfill]", collect_pages, backfill_pages, MODULE)
+        backfill.update(pages=len(zips), zoho_calls={name: count - calls_before[name] for name, count in fake_zoho.calls.items()})
+        results.append(backfill)
+
+        # 2. Transformación con cada parser
+        dataframe = None
+        for parser in args.parsers:
+            zip_copies = [io.BytesIO(page) for page in pages]
+            dataframe, transform = measure_stage(f"transform[{parser}]", transform_data_in_memory, zip_copies, parser=parser, module_api_name=MODULE)
+            transform.update(rows=len(dataframe), rows_per_second=round(len(dataframe) / transform['seconds']) if transform['seconds'] else None,
+                             frame_mb=round(dataframe.memory_usage(deep=True).sum() / 1e6, 1))
+            results.append(transform)
+
+        # 3. Carga con cada backend
+        for backend in args.backends:
+            client = FakeBigQueryClient(PROJECT_ID, upload_mb_per_second=args.upload_mb_per_second)
+            with install_fake_bigquery(client):
+                _, load = measure_stage(f"load[{backend}]", load_data_to_bigquery, dataframe, PROJECT_ID, DESTINATION_TABLE, backend=backend, client=client)
+            load.update(rows=len(dataframe), uploaded_mb=round(client.loaded_bytes / 1e6, 1), rows_per_second=round(len(dataframe) / load['seconds']) if load['seconds'] else None)
+            results.append(load)
+
+        # 4. Pipeline completo, en memoria y en streaming
+        for streaming in (False, True):
+            for parser in args.parsers:
+                for backend in args.backends:
+                    client = FakeBigQueryClient(PROJECT_ID, upload_mb_per_second=args.upload_mb_per_second)
+                    with fake_zoho.install(history_path), install_fake_bigquery(client):
+                        report, pipeline = measure_stage(
+                            f"pipeline[{'streaming' if streaming else 'memoria'}|{parser}|{backend}]", run_etl_pipeline,
+                            MODULE, "", "", "", "", True, max_concurrent_jobs=args.max_concurrent_jobs, streaming=streaming,
+                            csv_parser=parser, load_backend=backend, project_id=PROJECT_ID, destination_table=DESTINATION_TABLE, return_report=True
+                        )
+                    pipeline.update(success=report['success'], rows=report['rows'], stages=report['metrics']['stages'])
+                    results.append(pipeline)
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline del ETL de Zoho a BigQuery.")
+    parser.add_argument("--pages", type=int, default=3, help="páginas de Bulk Read a generar")
+    parser.add_argument("--rows", type=int, default=20000, help="filas por página")
+    parser.add_argument("--columns", type=int, default=30, help="columnas adicionales a Id y las fechas")
+    parser.add_argument("--null-rate", type=float, default=0.1, help="proporción de valores nulos")
+    parser.add_argument("--seed", type=int, default=0, help="semilla de los datos sintéticos")
+    parser.add_argument("--queue-latency", type=float, default=0.5, help="segundos que cada trabajo pasa en la cola de Zoho")
+    parser.add_argument("--download-mb-per-second", type=float, default=None, help="ancho de banda simulado de las descargas")
+    parser.add_argument("--upload-mb-per-second", type=float, default=None, help="ancho de banda simulado de las cargas")
+    parser.add_argument("--max-concurrent-jobs", type=int, default=3, help="trabajos de Bulk Read en vuelo")
+    parser.add_argument("--parsers", nargs="+", default=list(CSV_PARSERS), choices=CSV_PARSERS, help="parsers de CSV a comparar")
+    parser.add_argument("--backends", nargs="+", default=list(LOAD_BACKENDS), choices=LOAD_BACKENDS, help="backends de carga a comparar")
+    parser.add_argument("--output", default=None, help="archivo json donde guardar los resultados")
+    args = parser.parse_args()
+
+    results = run(args)
+    for result in results:
+        details = {key: value for key, value in result.items() if key not in ('stage', 'seconds', 'stages')}
+        print(f"{result['stage']:<45} {result['seconds']:>9.3f} s  {details}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
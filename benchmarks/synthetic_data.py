@@ -0,0 +1,75 @@
+import csv #escribir el csv de cada página
+import io #armar los ZIPs en memoria
+import random #valores sintéticos reproducibles
+import zipfile #comprimir cada página como la entrega Zoho
+from datetime import datetime, timedelta, timezone
+
+# Encabezados con acentos y caracteres especiales como los que exporta Zoho
+ACCENTED_HEADERS = [
+    "Teléfono", "Dirección de Envío", "Año de Compra", "Categoría", "Descripción",
+    "Código Postal", "¿Es Cliente?", "Número de Empleados", "Compañía", "Ingresos Anuales (USD)",
+]
+PICKLIST_VALUES = ["Nuevo", "Contactado", "Calificado", "Perdido", "Ganado"]
+FIRST_ID = 4876543000000000000
+
+
+def make_headers(columns: int) -> list:
+    """Encabezados de una página: Id, fechas de creación y modificación y `columns` columnas adicionales."""
+    headers = ["Id", "Created_Time", "Modified_Time"]
+    for i in range(columns):
+        base = ACCENTED_HEADERS[i % len(ACCENTED_HEADERS)]
+        headers.append(base if i < len(ACCENTED_HEADERS) else f"{base} {i // len(ACCENTED_HEADERS) + 1}")
+    return headers
+
+
+def _value(column_index: int, rng: random.Random):
+    # Cada columna adicional tiene un tipo fijo para que la inferencia de tipos tenga algo que hacer
+    kind = column_index % 6
+    if kind == 0:
+        return f"0{rng.randint(300000000, 399999999)}" # teléfono con cero a la izquierda
+    if kind == 1:
+        return f"Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}, \"Torre\" {rng.randint(1, 5)}"
+    if kind == 2:
+        return str(rng.randint(1990, 2025))
+    if kind == 3:
+        return rng.choice(PICKLIST_VALUES)
+    if kind == 4:
+        # Texto largo con comas y saltos de línea dentro del valor
+        return "Nota de seguimiento,\nllamar de nuevo " + "x" * rng.randint(10, 200)
+    return rng.choice(["true", "false"]) if column_index % 12 == 5 else f"{rng.uniform(0, 1e6):.2f}"
+
+
+def make_page_csv(rows: int, columns: int, null_rate: float = 0.1, seed: int = 0, first_id: int = FIRST_ID) -> bytes:
+    """
+    CSV sintético con el formato de Bulk Read: Id numérico, fechas ISO 8601 con zona horaria
+    y columnas de texto, números, listas de selección y booleanos con valores nulos.
+    """
+    rng = random.Random(seed)
+    base_time = datetime(2024, 1, 1, tzinfo=timezone(timedelta(hours=-5)))
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(make_headers(columns))
+    for i in range(rows):
+        created = base_time + timedelta(minutes=rng.randint(0, 500000))
+        modified = created + timedelta(minutes=rng.randint(0, 50000))
+        row = [str(first_id + i), created.isoformat(), modified.isoformat()]
+        for column_index in range(columns):
+            row.append("" if rng.random() < null_rate else _value(column_index, rng))
+        writer.writerow(row)
+    return output.getvalue().encode("utf-8")
+
+
+def make_zip_page(module_api_name: str, rows: int, columns: int, null_rate: float = 0.1, seed: int = 0, first_id: int = FIRST_ID) -> bytes:
+    """ZIP de una página con un único CSV, como el que devuelve la descarga de un trabajo de Bulk Read."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as z:
+        z.writestr(f"{module_api_name}.csv", make_page_csv(rows, columns, null_rate, seed, first_id))
+    return buffer.getvalue()
+
+
+def make_pages(module_api_name: str, pages: int, rows_per_page: int, columns: int, null_rate: float = 0.1, seed: int = 0) -> list:
+    """Lista de ZIPs sintéticos (bytes), uno por página, con Ids consecutivos entre páginas."""
+    return [
+        make_zip_page(module_api_name, rows_per_page, columns, null_rate, seed + page, FIRST_ID + page * rows_per_page)
+        for page in range(pages)
+    ]
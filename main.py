@@ -1,53 +1,416 @@
-from SRC.Extract.extractor import extract_data_from_zoho
-from SRC.Load.loader import load_data_to_bigquery
-from SRC.Transform.transform import transform_data_in_memory
+import threading #cupos globales de trabajos de Zoho compartidos entre módulos
+import time #medir la duración de cada módulo
+_import_start = time.perf_counter()
+from concurrent.futures import ThreadPoolExecutor #ejecutar varios módulos en paralelo
+from SRC.Extract.extractor import extract_data_from_zoho, iter_zoho_pages, collect_pages, initialize_zoho_sdk, get_module_field_types, criteria_start_date, ZOHO_MAX_CONCURRENT_JOBS
+from SRC.Extract.checkpoint import ExtractionCheckpoint
+from SRC.Extract.backfill import iter_backfill_pages, default_backfill_end, DEFAULT_INITIAL_SLICES
+# Las etapas de transformación y carga (pandas, pandas_gbq, google-cloud) se importan dentro de las
+# funciones que las usan, y se precargan en segundo plano mientras se extrae de Zoho (ver _stage_modules)
 from SRC.helper.logger_config import setup_logger
+from SRC.helper.state_store import JsonStateStore
+from SRC.helper.row_hash_index import RowHashIndex
+from SRC.helper.metrics import PipelineMetrics, measure
+from SRC.helper.startup import record_startup_time, preload_modules, mark_invocation, startup_timings
 
 logger = setup_logger("main")
 
+# Tabla destino por defecto de cada módulo
+DEFAULT_DESTINATION_TEMPLATE = "raw_external_data.zohocrm_primary__{module}"
+
+record_startup_time("import:main", time.perf_counter() - _import_start)
+
 
 # # --- Orquestador Principal del ETL ---
-def run_etl_pipeline(module_api_name: str,client_id: str,client_secret: str,refresh_token: str,user_email: str, full_data: bool = True, created_column_date: str = "Created_Time", updated_column_date: str = "Modified_Time", periodo: int = 7):
+def run_etl_pipeline(module_api_name: str,client_id: str,client_secret: str,refresh_token: str,user_email: str, full_data: bool = True, created_column_date: str = "Created_Time", updated_column_date: str = "Modified_Time", periodo: int = 7, max_concurrent_jobs: int = 1, streaming: bool = False, csv_parser: str = "pandas", load_backend: str = "pandas_gbq", load_workers: int = 1, state_store=None, write_mode: str = "append", project_id: str = None, destination_table: str = None, job_slots=None, return_report: bool = False, typed: bool = False, field_types_path: str = None, resume: bool = False, backfill_start: str = None, backfill_slices: int = DEFAULT_INITIAL_SLICES, fields: list = None, fields_from_table: bool = False, hash_index: RowHashIndex = None, hash_exclude: list = None):
     """
     Orquesta el flujo completo de ETL (Extracción, Transformación, Carga)
     para un módulo específico de Zoho, recibiendo credenciales.
+    max_concurrent_jobs define cuántos trabajos de Bulk Read se mantienen en vuelo a la vez durante la extracción.
+    Con streaming=True cada página se descarga, transforma y carga antes de retener la siguiente,
+    de modo que la memoria máxima se mantiene cerca de una sola página.
+    csv_parser elige el motor de lectura del CSV ("pandas", "chunked" o "pyarrow"); los dos últimos leen por lotes.
+    load_backend elige cómo se carga a BigQuery ("pandas_gbq" o "parquet") y load_workers cuántas
+    cargas se ejecutan en paralelo en modo streaming.
+    state_store (StateStore): si se indica, las ejecuciones incrementales extraen solo lo modificado desde la
+    última marca de agua cargada con éxito (en lugar de los últimos `periodo` días), y al terminar la carga
+    se registra la nueva marca de agua. En ese caso una extracción o transformación incompleta se trata como fallo.
+    write_mode="merge" elimina duplicados por Id dentro del lote y hace MERGE sobre la tabla destino
+    conservando el registro con la fecha de actualización más reciente, en lugar de agregar filas.
+    project_id y destination_table definen la tabla de BigQuery; por defecto se usa el proyecto de
+    Credentials.json y DEFAULT_DESTINATION_TEMPLATE.
+    job_slots es un semáforo de cupos de trabajos de Zoho compartido entre módulos (ver run_multi_module_pipeline).
+    typed=True convierte las columnas a tipos compactos (fechas, números, booleanos, categorías) según los
+    metadatos de campos de Zoho, inferidos de los datos para las columnas sin metadatos; field_types_path
+    permite usar un archivo json local de metadatos (api_name -> data_type) en lugar de consultar a Zoho.
+    resume=True guarda un manifiesto de la extracción y descarga las páginas a disco (/tmp/zoho_etl_state/checkpoints):
+    si la ejecución falla, un reintento con los mismos parámetros reutiliza las páginas descargadas y los trabajos
+    que Zoho todavía conserva (un día), y continúa desde la primera página pendiente. Una extracción incompleta
+    se trata como fallo, y el manifiesto se borra cuando la carga termina con éxito.
+    backfill_start (str): si se indica, hace una extracción completa en paralelo por rangos de created_column_date
+    desde esa fecha ISO 8601 hasta hoy, en backfill_slices rangos iniciales que se dividen automáticamente cuando
+    superan el límite de registros por trabajo, con hasta max_concurrent_jobs trabajos en vuelo (ignora full_data y periodo).
+    fields (list): api_names de Zoho de los campos a exportar en los trabajos de Bulk Read (Id y las columnas de fecha
+    se agregan siempre); con fields_from_table=True se exportan solo los campos que ya tiene la tabla destino
+    (si la tabla no existe se exportan todos). Menos campos reducen el tamaño de las descargas y el tiempo de lectura.
+    hash_index (RowHashIndex): si se indica, se calcula un hash del contenido de cada fila y se descartan antes de la
+    carga las filas cuyo hash coincide con el de la última carga de su Id; el índice se actualiza después de cargar.
+    hash_exclude (list): nombres de Zoho de las columnas que no cuentan para el hash. Por defecto updated_column_date,
+    Modified_Time y Modified_By, para que los registros tocados por una automatización sin cambios no se vuelvan a cargar.
+    Durante la ejecución se registran métricas por página y por etapa (cola de Zoho, consultas de estado,
+    bytes y velocidad de descarga, lectura del CSV, filas, carga y memoria máxima) como líneas json del logger "metrics".
+    Las librerías de transformación y carga se precargan en un hilo mientras se extrae de Zoho, y el SDK de Zoho,
+    las credenciales y el cliente de BigQuery se reutilizan en las invocaciones en caliente del mismo proceso.
+    Retorna True/False según el resultado, o con return_report=True un diccionario con
+    module, success, pages, rows, seconds, cold_start (primera ejecución del proceso) y metrics (resumen de las
+    métricas de la ejecución, con los tiempos de importación e inicialización del proceso en metrics['startup']).
     """
     logger.info(f"\n--- INICIANDO PIPELINE ETL COMPLETO PARA EL MÓDULO: {module_api_name} ---")
+    destination_table = destination_table or DEFAULT_DESTINATION_TEMPLATE.format(module=module_api_name.lower())
+    report = {'module': module_api_name, 'success': False, 'pages': 0, 'rows': 0, 'seconds': None, 'cold_start': mark_invocation()}
+    metrics = PipelineMetrics(module_api_name)
+    preload_modules(_stage_modules(csv_parser, load_backend, write_mode, typed))
     
     try:
+        since = None
+        if state_store is not None and not full_data and not backfill_start:
+            since = state_store.get_watermark(module_api_name)
+            if since:
+                logger.info(f"Extracción incremental desde la marca de agua {since}.")
+            else:
+                logger.info(f"No hay marca de agua para {module_api_name}. Se usarán los últimos {periodo} días.")
+
+        if fields_from_table:
+            fields = _fields_from_table(module_api_name, project_id, destination_table, fields)
+
+        # Con marca de agua, checkpoint o índice de hashes una extracción o transformación incompleta es un fallo:
+        # si no, se registraría el avance sobre registros que nunca se cargaron
+        allow_partial = state_store is None and not resume and hash_index is None
+
+        backfill_pages = None
+        if backfill_start:
+            backfill_end = default_backfill_end()
+            checkpoint = ExtractionCheckpoint(module_api_name, None, created_column_date, updated_column_date, variant=f"backfill|{backfill_start}|{backfill_end}|{backfill_slices}", fields=fields) if resume else None
+            backfill_pages = iter_backfill_pages(module_api_name, client_id, client_secret, refresh_token, user_email, backfill_start, backfill_end, backfill_slices,
+                                                 created_column_date=created_column_date, updated_column_date=updated_column_date, max_concurrent_jobs=max_concurrent_jobs,
+                                                 job_slots=job_slots, checkpoint=checkpoint, metrics=metrics, fields=fields)
+        else:
+            checkpoint = ExtractionCheckpoint(module_api_name, criteria_start_date(full_data, periodo, since), created_column_date, updated_column_date, fields=fields) if resume else None
+        column_kinds = _get_column_kinds(module_api_name, client_id, client_secret, refresh_token, user_email, field_types_path) if typed else None
+
+        if streaming:
+            report['pages'], report['rows'] = _run_streaming_pipeline(module_api_name, client_id, client_secret, refresh_token, user_email, full_data, created_column_date, updated_column_date, periodo, max_concurrent_jobs, csv_parser, load_backend, load_workers, since, state_store, write_mode, project_id, destination_table, job_slots, column_kinds, checkpoint, metrics, backfill_pages, fields, hash_index, hash_exclude)
+            if checkpoint is not None:
+                checkpoint.clear()
+            report['success'] = True
+            return _finish_report(report, metrics, return_report)
+
         # Paso 1: Extracción
-        list_of_zip_bytes = extract_data_from_zoho(
-            module_api_name,
-            client_id,
-            client_secret,
-            refresh_token,
-            user_email,
-            full_data=full_data,
-            created_column_date=created_column_date,
-            updated_column_date=updated_column_date,
-            period=periodo
-            
-        )
+        if backfill_pages is not None:
+            downloaded_pages = collect_pages(backfill_pages, module_api_name, allow_partial=allow_partial, with_keys=True)
+        else:
+            downloaded_pages = extract_data_from_zoho(
+                module_api_name,
+                client_id,
+                client_secret,
+                refresh_token,
+                user_email,
+                full_data=full_data,
+                created_column_date=created_column_date,
+                updated_column_date=updated_column_date,
+                period=periodo,
+                max_concurrent_jobs=max_concurrent_jobs,
+                since=since,
+                allow_partial=allow_partial,
+                job_slots=job_slots,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                fields=fields,
+                with_keys=True
+            )
+        # Las métricas de la transformación usan las mismas páginas que la extracción (números o claves de rango)
+        page_keys = [page for page, _ in downloaded_pages]
+        list_of_zip_bytes = [content for _, content in downloaded_pages]
         if not list_of_zip_bytes:
             logger.error("ERROR: No se pudieron extraer datos de Zoho. Deteniendo el pipeline.")
-            return False
+            return _finish_report(report, metrics, return_report)
+        report['pages'] = len(list_of_zip_bytes)
 
         # Paso 2: Transformación
-        final_dataframe = transform_data_in_memory(list_of_zip_bytes)
+        from SRC.Transform.transform import transform_data_in_memory, max_watermark, deduplicate_records, drop_unchanged_rows, HASH_EXCLUDED_COLUMNS
+        from SRC.Transform.schema_mapping import get_schema_mapper
+        from SRC.Transform.field_types import apply_field_types
+        from SRC.Load.loader import load_data_to_bigquery
+        final_dataframe = transform_data_in_memory(list_of_zip_bytes, parser=csv_parser, module_api_name=module_api_name, metrics=metrics, allow_partial=allow_partial, page_keys=page_keys)
+        # Nombres de BigQuery de la llave y la fecha de actualización según el mapeo del módulo
+        schema_mapper = get_schema_mapper(module_api_name)
+        key_column, order_column = schema_mapper.clean_column("Id"), schema_mapper.clean_column(updated_column_date)
+        excluded_columns = [schema_mapper.clean_column(column) for column in (hash_exclude if hash_exclude is not None else (updated_column_date, *HASH_EXCLUDED_COLUMNS))]
+        # La marca de agua cubre también las filas sin cambios que se descartan a continuación
+        new_watermark = max_watermark(final_dataframe, order_column, since) if state_store is not None else None
+        changed_hashes = []
+        if hash_index is not None:
+            with measure(metrics, 'row_hash'):
+                total_rows = len(final_dataframe)
+                final_dataframe, changed_hashes = drop_unchanged_rows(final_dataframe, key_column, hash_index, module_api_name, excluded_columns)
+            metrics.increment('rows_unchanged', total_rows - len(final_dataframe))
         if final_dataframe.empty:
             logger.info("AVISO: El DataFrame final está vacío después de la transformación. No se cargará nada.")
-            return True # Considerar como éxito si no hay datos, pero el proceso fue correcto
+            if new_watermark:
+                state_store.set_watermark(module_api_name, new_watermark)
+            if checkpoint is not None:
+                checkpoint.clear()
+            report['success'] = True # Considerar como éxito si no hay datos, pero el proceso fue correcto
+            return _finish_report(report, metrics, return_report)
+        if column_kinds is not None:
+            with measure(metrics, 'typing'):
+                final_dataframe = apply_field_types(final_dataframe, column_kinds)
 
         # Paso 3: Carga
         table_name = f"data_{module_api_name}_consolidado"
-        load_data_to_bigquery(final_dataframe, PROJECT_ID, DESTINATION_ID)
+        if write_mode == "merge":
+            with measure(metrics, 'deduplicate'):
+                final_dataframe = deduplicate_records(final_dataframe, key_column, order_column)
+        load_data_to_bigquery(final_dataframe, project_id, destination_table, backend=load_backend, write_mode=write_mode, key_column=key_column, order_column=order_column, metrics=metrics)
+
+        # Paso 4: Registrar la marca de agua y los hashes solo después de una carga exitosa
+        if new_watermark:
+            state_store.set_watermark(module_api_name, new_watermark)
+        if hash_index is not None:
+            hash_index.update(module_api_name, changed_hashes)
+        if checkpoint is not None:
+            checkpoint.clear()
         
+        report['rows'] = len(final_dataframe)
+        report['success'] = True
         logger.info(f"\n--- PIPELINE ETL COMPLETO EXITOSAMENTE PARA EL MÓDULO: {module_api_name} ---")
-        return True
+        return _finish_report(report, metrics, return_report)
 
     except Exception as e:
         logger.exception(f"ERROR: Fallo general en el pipeline ETL para {module_api_name}. Causa: {e}")
-        return False
+        return _finish_report(report, metrics, return_report)
+
+
+def _get_column_kinds(module_api_name: str, client_id: str, client_secret: str, refresh_token: str, user_email: str, field_types_path: str = None):
+    """
+    Retorna los tipos de columna del módulo (ModuleColumnKinds) a partir de los metadatos de campos.
+    Si no hay metadatos, las columnas se tipan solo por inferencia. Los tipos ya decididos en ejecuciones
+    anteriores se conservan, para que las columnas no cambien de tipo en la tabla destino.
+    """
+    from SRC.Transform.schema_mapping import get_schema_mapper
+    from SRC.Transform.field_types import kinds_from_zoho_fields, ModuleColumnKinds
+    if field_types_path is None:
+        initialize_zoho_sdk(client_id, client_secret, refresh_token, user_email)
+    field_types = get_module_field_types(module_api_name, fields_path=field_types_path, max_age_hours=None if field_types_path else 24)
+    if not field_types:
+        logger.warning(f"AVISO: No hay metadatos de campos para {module_api_name}. Los tipos se inferirán de los datos.")
+    return ModuleColumnKinds(module_api_name, kinds_from_zoho_fields(field_types, get_schema_mapper(module_api_name)))
+
+
+def _fields_from_table(module_api_name: str, project_id: str, destination_table: str, fields: list = None) -> list:
+    """
+    Campos de Zoho a exportar según las columnas de la tabla destino, traducidas a api_names con el
+    mapeo de columnas del módulo, más los indicados en fields. Retorna fields si la tabla no existe.
+    Sin mapeo (por ejemplo en una instancia nueva) una columna cuyo nombre ya es un nombre limpio se
+    pide a Zoho con ese mismo nombre.
+    """
+    from SRC.Transform.schema_mapping import get_schema_mapper, clean_name, RESERVED_COLUMNS
+    from SRC.Load.loader import get_table_columns
+    columns = get_table_columns(project_id, destination_table)
+    if columns is None:
+        logger.info(f"No se pudo limitar la extracción de {module_api_name} a las columnas de la tabla destino. Se exportarán {'los campos indicados' if fields else 'todos los campos'}.")
+        return fields
+    schema_mapper = get_schema_mapper(module_api_name)
+    table_fields = []
+    for column in columns:
+        if column in RESERVED_COLUMNS:
+            continue
+        field = schema_mapper.original_name(column)
+        if field is None and clean_name(column) == column:
+            # Los api_names de Zoho ya son nombres válidos para BigQuery y se cargan sin cambios
+            field = column
+        if field is None:
+            logger.warning(f"La columna {column} de {destination_table} no está en el mapeo de {module_api_name} ni es un nombre de campo válido. No se pedirá a Zoho.")
+            continue
+        table_fields.append(field)
+    return list(dict.fromkeys([*table_fields, *(fields or [])]))
+
+
+def _stage_modules(csv_parser: str, load_backend: str, write_mode: str, typed: bool) -> list:
+    """Módulos de transformación y carga que usará la ejecución, para precargarlos mientras se extrae de Zoho."""
+    modules = ["SRC.Transform.transform", "SRC.Load.loader"]
+    if typed:
+        modules.append("SRC.Transform.field_types")
+    if csv_parser == "pyarrow":
+        modules.append("pyarrow.csv")
+    modules.append("pandas_gbq" if load_backend == "pandas_gbq" and write_mode == "append" else "google.cloud.bigquery")
+    return modules
+
+
+def _finish_report(report: dict, metrics: PipelineMetrics, return_report: bool):
+    report['metrics'] = metrics.summary()
+    report['metrics']['startup'] = startup_timings()
+    report['seconds'] = report['metrics']['seconds']
+    metrics.log_event('run_summary', success=report['success'], cold_start=report['cold_start'], pages=report['pages'], rows=report['rows'], summary=report['metrics'])
+    return report if return_report else report['success']
+
+
+def _run_streaming_pipeline(module_api_name: str, client_id: str, client_secret: str, refresh_token: str, user_email: str, full_data: bool, created_column_date: str, updated_column_date: str, periodo: int, max_concurrent_jobs: int, csv_parser: str, load_backend: str, load_workers: int, since: str, state_store, write_mode: str, project_id: str, destination_table: str, job_slots, column_kinds=None, checkpoint: ExtractionCheckpoint = None, metrics: PipelineMetrics = None, zip_pages=None, fields: list = None, hash_index: RowHashIndex = None, hash_exclude: list = None):
+    """
+    Ejecuta el ETL página por página: cada ZIP se transforma y se carga a BigQuery
+    apenas se descarga, y se libera antes de procesar la siguiente página.
+    Con los parsers por lotes, cada lote de la página se carga por separado, y con
+    load_workers>1 se cargan varios lotes en paralelo mientras llegan los siguientes.
+    Si se indica column_kinds, cada lote se convierte a tipos compactos antes de cargarse.
+    zip_pages permite usar otra fuente de páginas (por ejemplo iter_backfill_pages) en lugar de iter_zoho_pages.
+    Con hash_index se descartan las filas sin cambios de cada página (sin contar las columnas de hash_exclude), y los hashes de las filas cargadas
+    se registran en el índice cuando termina la carga de todos los lotes de su página.
+    Con checkpoint, cada página cuyos lotes ya se cargaron se marca como LOADED en el manifiesto, y un
+    reintento no la vuelve a extraer ni a cargar (su marca de agua se recupera del manifiesto).
+    Retorna (páginas cargadas, filas cargadas).
+    """
+    from SRC.Transform.transform import iter_transformed_pages, max_watermark, deduplicate_records, drop_unchanged_rows, HASH_EXCLUDED_COLUMNS
+    from SRC.Transform.schema_mapping import get_schema_mapper
+    from SRC.Transform.field_types import apply_field_types
+    from SRC.Load.loader import load_batches_to_bigquery
+    import pandas as pd
+    if zip_pages is None:
+        zip_pages = iter_zoho_pages(
+            module_api_name,
+            client_id,
+            client_secret,
+            refresh_token,
+            user_email,
+            full_data=full_data,
+            created_column_date=created_column_date,
+            updated_column_date=updated_column_date,
+            period=periodo,
+            max_concurrent_jobs=max_concurrent_jobs,
+            since=since,
+            job_slots=job_slots,
+            checkpoint=checkpoint,
+            metrics=metrics,
+            fields=fields
+        )
+    loaded_pages = set()
+    watermark = since
+    if checkpoint is not None:
+        # Las páginas cargadas antes de un fallo no se vuelven a extraer; su marca de agua está en el manifiesto
+        watermark = max([w for w in (since, *checkpoint.loaded_watermarks()) if w], key=pd.Timestamp, default=None)
+    unloaded_batches = {} # página -> lotes entregados al cargador que todavía no terminan
+    closed_pages = set() # páginas cuyos lotes ya se entregaron todos al cargador
+    page_watermarks = {} # página -> marca de agua de sus filas
+    page_hashes = {} # página -> (Id, hash) de sus filas cambiadas
+    # Nombres de BigQuery de la llave y la fecha de actualización según el mapeo del módulo
+    schema_mapper = get_schema_mapper(module_api_name)
+    key_column, order_column = schema_mapper.clean_column("Id"), schema_mapper.clean_column(updated_column_date)
+    excluded_columns = [schema_mapper.clean_column(column) for column in (hash_exclude if hash_exclude is not None else (updated_column_date, *HASH_EXCLUDED_COLUMNS))]
+    # Con marca de agua, checkpoint o índice de hashes una página que no se puede transformar hace fallar la ejecución
+    allow_partial = state_store is None and checkpoint is None and hash_index is None
+
+    def page_loaded(page):
+        # Todos los lotes de la página ya están en BigQuery
+        closed_pages.discard(page)
+        unloaded_batches.pop(page, None)
+        if hash_index is not None:
+            hash_index.update(module_api_name, page_hashes.pop(page, []))
+        if checkpoint is not None:
+            checkpoint.mark_loaded(page, watermark=page_watermarks.pop(page, None))
+
+    def close_page(page):
+        closed_pages.add(page)
+        if not unloaded_batches.get(page):
+            page_loaded(page)
+
+    def batch_loaded(page):
+        unloaded_batches[page] -= 1
+        if page in closed_pages and not unloaded_batches[page]:
+            page_loaded(page)
+
+    def non_empty_batches():
+        nonlocal watermark
+        current_page = None
+        for page, dataframe in iter_transformed_pages(zip_pages, parser=csv_parser, module_api_name=module_api_name, metrics=metrics, allow_partial=allow_partial):
+            # Los lotes de una página llegan seguidos: al cambiar de página la anterior ya se entregó completa
+            if page != current_page:
+                if current_page is not None:
+                    close_page(current_page)
+                current_page = page
+            # La marca de agua cubre también las filas sin cambios que se descartan
+            watermark = max_watermark(dataframe, order_column, watermark)
+            page_watermarks[page] = max_watermark(dataframe, order_column, page_watermarks.get(page))
+            if hash_index is not None and not dataframe.empty:
+                with measure(metrics, 'row_hash', page):
+                    total_rows = len(dataframe)
+                    dataframe, id_hashes = drop_unchanged_rows(dataframe, key_column, hash_index, module_api_name, excluded_columns)
+                page_hashes.setdefault(page, []).extend(id_hashes)
+                if metrics is not None:
+                    metrics.increment('rows_unchanged', total_rows - len(dataframe))
+            if dataframe.empty:
+                logger.info(f"AVISO: La página {page} está vacía después de la transformación. No se cargará nada.")
+                continue
+            if column_kinds is not None:
+                with measure(metrics, 'typing', page):
+                    dataframe = apply_field_types(dataframe, column_kinds)
+            if write_mode == "merge":
+                with measure(metrics, 'deduplicate', page):
+                    dataframe = deduplicate_records(dataframe, key_column, order_column)
+            loaded_pages.add(page)
+            unloaded_batches[page] = unloaded_batches.get(page, 0) + 1
+            yield page, dataframe
+        if current_page is not None:
+            close_page(current_page)
+
+    loaded_rows = load_batches_to_bigquery(non_empty_batches(), project_id, destination_table, backend=load_backend, max_workers=load_workers, write_mode=write_mode, key_column=key_column, order_column=order_column, metrics=metrics, on_loaded=batch_loaded, with_pages=True)
+
+    # Si alguna página falló, la excepción ya se propagó y la marca de agua no avanza; el índice de hashes
+    # y el checkpoint solo registran las páginas que terminaron de cargarse
+    if state_store is not None and watermark:
+        state_store.set_watermark(module_api_name, watermark)
+
+    logger.info(f"\n--- PIPELINE ETL EN STREAMING COMPLETO PARA EL MÓDULO: {module_api_name}. Páginas cargadas: {len(loaded_pages)}, filas: {loaded_rows} ---")
+    return len(loaded_pages), loaded_rows
+
+
+def run_multi_module_pipeline(module_configs: list[dict], client_id: str, client_secret: str, refresh_token: str, user_email: str, max_parallel_modules: int = 4, max_total_jobs: int = ZOHO_MAX_CONCURRENT_JOBS, **common_options) -> list[dict]:
+    """
+    Ejecuta el ETL de varios módulos de Zoho en paralelo dentro del mismo proceso.
+    El SDK se inicializa una sola vez y todos los módulos comparten el almacén de tokens y
+    un tope global de trabajos de Bulk Read simultáneos (max_total_jobs).
+    Retorna un reporte por módulo (module, success, pages, rows, seconds, metrics), en el mismo orden de module_configs.
+
+    Args:
+        module_configs (list[dict]): configuración por módulo; cada dict lleva 'module_api_name' y opcionalmente
+            cualquier parámetro de run_etl_pipeline (full_data, periodo, destination_table, max_concurrent_jobs...).
+        max_parallel_modules (int): número máximo de módulos ejecutándose a la vez.
+        max_total_jobs (int): tope de trabajos de Bulk Read en vuelo sumando todos los módulos (límite de Zoho).
+        common_options: parámetros de run_etl_pipeline comunes a todos los módulos; la configuración de cada módulo los sobreescribe.
+    """
+    logger.info(f"\n--- INICIANDO PIPELINE MULTI-MÓDULO: {len(module_configs)} módulos, {max_parallel_modules} en paralelo, {max_total_jobs} trabajos de Zoho como máximo ---")
+    start_time = time.perf_counter()
+    initialize_zoho_sdk(client_id, client_secret, refresh_token, user_email)
+    job_slots = threading.BoundedSemaphore(min(max_total_jobs, ZOHO_MAX_CONCURRENT_JOBS))
+
+    with ThreadPoolExecutor(max_workers=max_parallel_modules) as executor:
+        futures = [
+            executor.submit(
+                run_etl_pipeline,
+                client_id=client_id,
+                client_secret=client_secret,
+                refresh_token=refresh_token,
+                user_email=user_email,
+                job_slots=job_slots,
+                return_report=True,
+                **{**common_options, **config}
+            )
+            for config in module_configs
+        ]
+        reports = [future.result() for future in futures]
+
+    logger.info(f"\n--- PIPELINE MULTI-MÓDULO FINALIZADO EN {time.perf_counter() - start_time:.1f} s ---")
+    for report in reports:
+        logger.info(f"   {report['module']}: {'Éxito' if report['success'] else 'Fallo'} | páginas: {report['pages']} | filas: {report['rows']} | {report['seconds']} s")
+    return reports
 
 
 if __name__ == '__main__':
@@ -62,6 +425,18 @@ if __name__ == '__main__':
     CREATED_COLUMN_DATE = "Created_Time"
     UPDATED_COLUMN_DATE = "Modified_Time"
     PERIODO = 1
+    MAX_CONCURRENT_JOBS = 1  # Trabajos de Bulk Read en vuelo a la vez (máximo 10 por límite de Zoho)
+    STREAMING = False  # Cambiar a True para transformar y cargar cada página apenas se descarga
+    CSV_PARSER = "pandas"  # "chunked" o "pyarrow" para leer cada CSV por lotes
+    LOAD_BACKEND = "pandas_gbq"  # "parquet" para cargar con load jobs de BigQuery en formato Parquet
+    LOAD_WORKERS = 1  # Cargas en paralelo en modo streaming
+    WRITE_MODE = "append"  # "merge" para hacer MERGE por Id en lugar de agregar filas duplicadas
+    HASH_INDEX = None  # RowHashIndex() para cargar solo las filas nuevas o modificadas desde la última carga
+    STATE_STORE = None  # JsonStateStore() para guardar una marca de agua por módulo y extraer solo lo modificado desde la última carga
+    BACKFILL_START = None  # Fecha ISO 8601 (ej. "2015-01-01T00:00:00-05:00") para una carga inicial en paralelo por rangos de creación
+    RESUME = False  # Cambiar a True para reanudar desde las páginas ya descargadas si la ejecución anterior falló
+    FIELDS = None  # Lista de api_names (ej. ["Last_Name", "Email", "Lead_Status"]) para exportar solo esos campos; None exporta todos
+    TYPED = False  # Cambiar a True para cargar fechas, números y booleanos con su tipo en lugar de texto
     # --- Configuración General 
     PROJECT_ID = ""
     DESTINATION_ID = f"raw_external_data.zohocrm_primary__{MODULE.lower()}"
@@ -76,6 +451,20 @@ if __name__ == '__main__':
         FULL_DATA,
         CREATED_COLUMN_DATE,
         UPDATED_COLUMN_DATE,
-        PERIODO
+        PERIODO,
+        MAX_CONCURRENT_JOBS,
+        STREAMING,
+        CSV_PARSER,
+        LOAD_BACKEND,
+        LOAD_WORKERS,
+        STATE_STORE,
+        WRITE_MODE,
+        project_id=PROJECT_ID,
+        destination_table=DESTINATION_ID,
+        typed=TYPED,
+        resume=RESUME,
+        backfill_start=BACKFILL_START,
+        fields=FIELDS,
+        hash_index=HASH_INDEX
     )
     logger.info(f"Resultado de la prueba local: {'Éxito' if success else 'Fallo'}")
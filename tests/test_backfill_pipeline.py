@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from benchmarks.synthetic_data import make_pages
+from benchmarks.fake_zoho import FakeBulkRead
+from benchmarks.fake_bigquery import FakeBigQueryClient, install_fake_bigquery
+from benchmarks.run_benchmark import isolated_state, MODULE, PROJECT_ID, DESTINATION_TABLE
+from main import run_etl_pipeline
+
+
+def test_non_streaming_backfill_loads_every_row_and_reports_metrics(tmp_path):
+    pages = make_pages(MODULE, 3, 200, 4)
+    fake_zoho = FakeBulkRead(pages, queue_latency=0.01, module_api_name=MODULE)
+    client = FakeBigQueryClient(PROJECT_ID)
+    with isolated_state(str(tmp_path / "state")), fake_zoho.install(str(tmp_path / "job_history.json"), poll_interval=0.01), install_fake_bigquery(client):
+        report = run_etl_pipeline(MODULE, "", "", "", "", streaming=False, backfill_start="2024-01-01", backfill_slices=2, max_concurrent_jobs=3,
+                                  project_id=PROJECT_ID, destination_table=DESTINATION_TABLE, return_report=True)
+
+    assert report['success']
+    assert report['rows'] == 600
+    assert client.load_jobs == 1
+    # Extracción y transformación registran las métricas con la misma clave de rango
+    downloaded = {page: entry for page, entry in report['metrics']['pages'].items() if 'bytes' in entry}
+    assert downloaded and all(isinstance(page, str) and 'rows' in entry for page, entry in downloaded.items())
+    assert sum(entry['rows'] for entry in downloaded.values()) == 600
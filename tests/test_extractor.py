@@ -0,0 +1,29 @@
+import random
+import pytest
+
+from benchmarks.synthetic_data import make_pages
+from benchmarks.fake_zoho import FakeBulkRead
+from SRC.Extract.extractor import extract_data_from_zoho
+
+
+class RandomLatencyBulkRead(FakeBulkRead):
+    """Bulk Read falso en el que cada trabajo tarda un tiempo distinto en completarse."""
+
+    def __init__(self, pages: list, seed: int):
+        super().__init__(pages, queue_latency=0, module_api_name="Leads")
+        self.rng = random.Random(seed)
+
+    def create_bulk_read_job(self, *args, **kwargs):
+        job_id = super().create_bulk_read_job(*args, **kwargs)
+        with self._lock:
+            self.jobs[job_id]['ready_at'] += self.rng.uniform(0, 0.05)
+        return job_id
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_pages_past_the_last_page_are_not_downloaded_nor_returned(tmp_path, seed):
+    fake_zoho = RandomLatencyBulkRead(make_pages("Leads", 5, 5, 1), seed)
+    with fake_zoho.install(str(tmp_path / "job_history.json"), poll_interval=0.005):
+        pages = extract_data_from_zoho("Leads", "", "", "", "", True, "Created_Time", "Modified_Time", 1, max_concurrent_jobs=10, with_keys=True)
+    assert [page for page, _ in pages] == [1, 2, 3, 4, 5]
+    assert fake_zoho.calls['download'] == 5
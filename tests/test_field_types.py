@@ -0,0 +1,40 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from SRC.Transform.field_types import cast_column, infer_kind
+
+
+def test_integer_ids_keep_full_precision_with_nulls():
+    values = pd.Series(["4876543000000123457", None, "4876543000000123459", "9007199254740993", "10.0"], name="Numero")
+    converted = cast_column(values, 'integer')
+    assert str(converted.dtype) == 'Int64'
+    assert converted.tolist()[0] == 4876543000000123457
+    assert converted.tolist()[2] == 4876543000000123459
+    assert converted.tolist()[3] == 9007199254740993
+    assert converted.tolist()[4] == 10
+    assert converted.isna().tolist() == [False, True, False, False, False]
+
+
+def test_invalid_and_out_of_range_integers_become_null():
+    values = pd.Series(["1.5", "abc", "99999999999999999999", "-7"], name="Numero")
+    converted = cast_column(values, 'integer')
+    assert converted.isna().tolist() == [True, True, True, False]
+    assert converted.iloc[3] == -7
+    with pytest.raises(ValueError):
+        cast_column(values, 'integer', errors='raise')
+
+
+def test_id_like_columns_are_not_inferred_as_integers():
+    assert infer_kind(pd.Series(["4876543000000123457", "4876543000000123458"])) is None
+    assert infer_kind(pd.Series(["12", "345"])) == 'integer'
+
+
+def test_date_columns_load_as_bigquery_date():
+    from SRC.Load.loader import bigquery_schema_from_dataframe
+    converted = cast_column(pd.Series(["2024-02-29", None, "2024-13-01"], name="Fecha"), 'date')
+    assert str(converted.dtype.pyarrow_dtype) == "date32[day]"
+    assert converted.isna().tolist() == [False, True, True]
+    assert str(converted.iloc[0]) == "2024-02-29"
+    schema = bigquery_schema_from_dataframe(converted.to_frame())
+    assert schema[0].field_type == "DATE"
@@ -0,0 +1,49 @@
+import time
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from benchmarks.synthetic_data import make_pages
+from benchmarks.fake_zoho import FakeBulkRead
+from benchmarks.fake_bigquery import FakeBigQueryClient, install_fake_bigquery
+from benchmarks.run_benchmark import isolated_state, MODULE, PROJECT_ID, DESTINATION_TABLE
+from main import run_etl_pipeline
+
+
+class FailingBigQueryClient(FakeBigQueryClient):
+    """Cliente falso cuya segunda carga falla de inmediato mientras las demás tardan en terminar."""
+
+    def __init__(self, project: str):
+        super().__init__(project)
+        self.uploads = 0
+
+    def _upload(self, size: int):
+        with self._lock:
+            self.uploads += 1
+            upload = self.uploads
+        if upload == 2:
+            raise RuntimeError("carga fallida")
+        time.sleep(0.2)
+        super()._upload(size)
+
+
+def test_parallel_loads_that_succeed_are_not_repeated_on_resume(tmp_path):
+    fake_zoho = FakeBulkRead(make_pages(MODULE, 5, 100, 4), queue_latency=0.01, module_api_name=MODULE)
+    options = dict(streaming=True, load_workers=2, resume=True, project_id=PROJECT_ID, destination_table=DESTINATION_TABLE, return_report=True)
+    with isolated_state(str(tmp_path / "state")):
+        failing_client = FailingBigQueryClient(PROJECT_ID)
+        with fake_zoho.install(str(tmp_path / "job_history.json"), poll_interval=0.01), install_fake_bigquery(failing_client):
+            report = run_etl_pipeline(MODULE, "", "", "", "", **options)
+        assert not report['success']
+        # La otra carga en curso terminó después del fallo y quedó registrada en el checkpoint
+        assert failing_client.load_jobs == 1
+
+        client = FakeBigQueryClient(PROJECT_ID)
+        with fake_zoho.install(str(tmp_path / "job_history.json"), poll_interval=0.01), install_fake_bigquery(client):
+            report = run_etl_pipeline(MODULE, "", "", "", "", **options)
+        assert report['success']
+        assert client.load_jobs == 4
+        # El tiempo de carga se registra por página, como la extracción y la transformación
+        loaded = [page for page, entry in report['metrics']['pages'].items() if 'load_seconds' in entry]
+        assert len(loaded) == 4 and all(page in range(1, 6) for page in loaded)